@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app.db import engine
+from app.models import AuthAuditEvent
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = 1000
+AUDIT_QUERY_LIMIT = 1000
+AUDIT_WRITE_ATTEMPTS = 6
+AUDIT_RETRY_DELAY = 0.1
+
+
+@dataclass
+class AuditRecord:
+    occurred_at: datetime
+    event: str
+    user_id: int
+    account_id: Optional[int]
+
+
+class AuditLog:
+    # Events are queued in memory and written by one background thread. Each
+    # write drains whatever has accumulated (up to AUDIT_BATCH_SIZE) into a
+    # single transaction, so the commit cost is shared by the whole batch.
+    # When the queue is full, record() drops the event and counts it rather
+    # than blocking the request. A batch that hits a transient error (e.g.
+    # SQLite "database is locked") is retried with exponential backoff and is
+    # only counted as failed once every attempt has been used.
+    def __init__(self, bind: Engine, maxsize: int = AUDIT_QUEUE_SIZE) -> None:
+        self._bind = bind
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = object()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+
+    def record(self, event: str, user_id: int, account_id: Optional[int] = None) -> bool:
+        try:
+            self._queue.put_nowait(
+                AuditRecord(
+                    occurred_at=datetime.utcnow(),
+                    event=event,
+                    user_id=user_id,
+                    account_id=account_id,
+                )
+            )
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches,
+        }
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def flush(self) -> None:
+        # Without a writer thread nothing drains the queue; join() would hang.
+        if self._thread is None:
+            return
+        self._queue.join()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        # Blocks if the queue is full; the writer is still draining it.
+        self._queue.put(self._stop)
+        self._thread.join()
+        self._thread = None
+
+    def query(
+        self,
+        start: datetime,
+        end: datetime,
+        event: Optional[str] = None,
+        user_id: Optional[int] = None,
+        limit: int = AUDIT_QUERY_LIMIT,
+    ) -> List[AuditRecord]:
+        stmt = (
+            select(
+                AuthAuditEvent.occurred_at,
+                AuthAuditEvent.event,
+                AuthAuditEvent.user_id,
+                AuthAuditEvent.account_id,
+            )
+            .where(AuthAuditEvent.occurred_at >= start, AuthAuditEvent.occurred_at < end)
+            .order_by(AuthAuditEvent.occurred_at)
+            .limit(limit)
+        )
+        if event is not None:
+            stmt = stmt.where(AuthAuditEvent.event == event)
+        if user_id is not None:
+            stmt = stmt.where(AuthAuditEvent.user_id == user_id)
+        with self._bind.connect() as connection:
+            return [AuditRecord(**row._mapping) for row in connection.execute(stmt)]
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[AuditRecord] = []
+            item = self._queue.get()
+            while True:
+                if item is self._stop:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= AUDIT_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self._write_with_retry(batch)
+            finally:
+                for _ in range(len(batch) + (1 if stopping else 0)):
+                    self._queue.task_done()
+
+    def _write_with_retry(self, batch: List[AuditRecord]) -> None:
+        if not batch:
+            return
+        delay = AUDIT_RETRY_DELAY
+        for attempt in range(1, AUDIT_WRITE_ATTEMPTS + 1):
+            try:
+                self._write(batch)
+                return
+            except OperationalError as exc:
+                error: Exception = exc
+                if attempt == AUDIT_WRITE_ATTEMPTS:
+                    break
+                self.retries += 1
+                logger.warning(
+                    "Audit write failed (attempt %d), retrying in %.2fs", attempt, delay
+                )
+                time.sleep(delay)
+                delay *= 2
+            except Exception as exc:
+                error = exc
+                break
+        self.failed += len(batch)
+        logger.error("Failed to write %d audit events", len(batch), exc_info=error)
+
+    def _write(self, batch: List[AuditRecord]) -> None:
+        if not batch:
+            return
+        with self._bind.begin() as connection:
+            connection.execute(
+                insert(AuthAuditEvent.__table__), [asdict(record) for record in batch]
+            )
+        self.written += len(batch)
+        self.batches += 1
+
+
+audit_log = AuditLog(engine)
@@ -2,13 +2,19 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+import os
 import secrets
-from typing import Dict, List, Optional
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from fastapi import HTTPException, status
 
 ACCESS_TOKEN_TTL = timedelta(minutes=30)
 REFRESH_TOKEN_TTL = timedelta(days=7)
+INTROSPECTION_MAX_AGE = 60
+# Shared with the gateways allowed to call /auth/introspect. Unset disables
+# the endpoint rather than leaving it open.
+INTROSPECTION_SECRET = os.getenv("INTROSPECTION_SECRET", "")
 
 
 @dataclass
@@ -50,6 +56,16 @@ class SessionRecord:
     refresh_expires_at: datetime
 
 
+@dataclass
+class TokenIntrospection:
+    active: bool
+    status: str
+    user_id: Optional[int] = None
+    active_account_id: Optional[int] = None
+    role: Optional[str] = None
+    expires_in: int = 0
+
+
 ACCOUNTS: Dict[int, AccountRecord] = {
     1: AccountRecord(
         id=1,
@@ -124,6 +140,27 @@ MEMBERSHIPS: List[MembershipRecord] = [
 SESSIONS_BY_ACCESS: Dict[str, SessionRecord] = {}
 SESSIONS_BY_REFRESH: Dict[str, SessionRecord] = {}
 
+# Each role owns one bit; a set of roles compiles to the OR of their bits.
+# Superusers get every bit (-1), so any non-empty requirement matches. The
+# table is fixed: an unknown role in a requirement matches nobody, and an
+# unknown role on a membership is rejected rather than given a new bit.
+ROLE_BITS: Dict[str, int] = {"member": 1 << 0, "admin": 1 << 1}
+SUPERUSER_MASK = -1
+
+# Bumped on every mutation so admin listings can answer If-None-Match without
+# rebuilding their payload. The epoch keeps ETags from surviving a restart.
+COLLECTION_VERSIONS: Dict[str, int] = {"accounts": 0, "users": 0, "memberships": 0}
+ETAG_EPOCH = secrets.token_hex(4)
+
+COMPILED_ROLE_MASKS: Dict[Tuple[str, ...], int] = {}
+PERMISSION_MASKS: Dict[int, Dict[int, int]] = {}
+ACCOUNT_ROLES: Dict[int, Dict[int, str]] = {}
+# Bumped by every invalidation. Masks built from MEMBERSHIPS are only cached
+# if no invalidation happened while they were being built, so a concurrent
+# membership change can never leave stale masks behind.
+PERMISSION_GENERATION = 0
+PERMISSION_LOCK = threading.Lock()
+
 
 def authenticate_user(email: str, password: str) -> UserRecord:
     for user in USERS.values():
@@ -202,6 +239,56 @@ def get_session_from_access_token(access_token: str) -> SessionRecord:
     return session
 
 
+def authenticate_introspection_client(secret: Optional[str]) -> None:
+    if not INTROSPECTION_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token introspection is not enabled",
+        )
+    if not secret or not secrets.compare_digest(secret, INTROSPECTION_SECRET):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Introspection client credentials are invalid",
+        )
+
+
+def introspect_access_tokens(access_tokens: List[str]) -> List[TokenIntrospection]:
+    now = datetime.utcnow()
+    results: List[TokenIntrospection] = []
+    for access_token in access_tokens:
+        session = SESSIONS_BY_ACCESS.get(access_token)
+        if session is None:
+            results.append(TokenIntrospection(active=False, status="invalid"))
+            continue
+        expires_in = int((session.access_expires_at - now).total_seconds())
+        if expires_in <= 0:
+            results.append(
+                TokenIntrospection(active=False, status="expired", user_id=session.user_id)
+            )
+            continue
+        results.append(
+            TokenIntrospection(
+                active=True,
+                status="active",
+                user_id=session.user_id,
+                active_account_id=session.active_account_id,
+                role=get_account_roles(session.user_id).get(session.active_account_id),
+                expires_in=expires_in,
+            )
+        )
+    return results
+
+
+def introspection_max_age(results: List[TokenIntrospection]) -> int:
+    # Revocation (logout, refresh) is not pushed to callers, so even a long
+    # lived token is only cacheable for INTROSPECTION_MAX_AGE seconds.
+    max_age = INTROSPECTION_MAX_AGE
+    for result in results:
+        if result.active and result.expires_in < max_age:
+            max_age = result.expires_in
+    return max_age
+
+
 def get_memberships_for_user(user_id: int) -> List[MembershipRecord]:
     return [membership for membership in MEMBERSHIPS if membership.user_id == user_id]
 
@@ -215,6 +302,183 @@ def resolve_role(user_id: int, account_id: Optional[int]) -> Optional[str]:
     return None
 
 
+def bump_collection_version(collection: str) -> int:
+    COLLECTION_VERSIONS[collection] += 1
+    return COLLECTION_VERSIONS[collection]
+
+
+def collection_etag(*collections: str) -> str:
+    versions = "-".join(str(COLLECTION_VERSIONS[collection]) for collection in collections)
+    return f'"{ETAG_EPOCH}-{versions}"'
+
+
+def update_account(account_id: int, **changes: Any) -> AccountRecord:
+    account = ACCOUNTS.get(account_id)
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found",
+        )
+    for field, value in changes.items():
+        setattr(account, field, value)
+    bump_collection_version("accounts")
+    return account
+
+
+def update_user(user_id: int, **changes: Any) -> UserRecord:
+    user = USERS.get(user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    for field, value in changes.items():
+        setattr(user, field, value)
+    bump_collection_version("users")
+    return user
+
+
+def role_bit(role: str) -> int:
+    bit = ROLE_BITS.get(role)
+    if bit is None:
+        raise ValueError(f"Unknown role: {role!r}")
+    return bit
+
+
+def validate_role(role: str) -> str:
+    if role not in ROLE_BITS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown role: {role}",
+        )
+    return role
+
+
+def compile_roles(roles: Iterable[str]) -> int:
+    key = tuple(roles)
+    mask = COMPILED_ROLE_MASKS.get(key)
+    if mask is None:
+        mask = 0
+        for role in key:
+            mask |= ROLE_BITS.get(role, 0)
+        COMPILED_ROLE_MASKS[key] = mask
+    return mask
+
+
+def load_account_access(user_id: int) -> Tuple[Dict[int, str], Dict[int, int]]:
+    with PERMISSION_LOCK:
+        generation = PERMISSION_GENERATION
+    roles: Dict[int, str] = {}
+    masks: Dict[int, int] = {}
+    for membership in list(MEMBERSHIPS):
+        if membership.user_id == user_id:
+            roles[membership.account_id] = membership.role
+            masks[membership.account_id] = role_bit(membership.role)
+    with PERMISSION_LOCK:
+        if generation == PERMISSION_GENERATION:
+            ACCOUNT_ROLES[user_id] = roles
+            PERMISSION_MASKS[user_id] = masks
+    return roles, masks
+
+
+def get_account_roles(user_id: int) -> Dict[int, str]:
+    roles = ACCOUNT_ROLES.get(user_id)
+    if roles is None:
+        roles, _ = load_account_access(user_id)
+    return roles
+
+
+def get_account_masks(user_id: int) -> Dict[int, int]:
+    masks = PERMISSION_MASKS.get(user_id)
+    if masks is None:
+        _, masks = load_account_access(user_id)
+    return masks
+
+
+def get_permission_mask(user: UserRecord, account_id: Optional[int]) -> int:
+    if user.is_superuser:
+        return SUPERUSER_MASK
+    if account_id is None:
+        return 0
+    return get_account_masks(user.id).get(account_id, 0)
+
+
+def invalidate_permissions(user_id: Optional[int] = None) -> None:
+    global PERMISSION_GENERATION
+    with PERMISSION_LOCK:
+        PERMISSION_GENERATION += 1
+        if user_id is None:
+            PERMISSION_MASKS.clear()
+            ACCOUNT_ROLES.clear()
+        else:
+            PERMISSION_MASKS.pop(user_id, None)
+            ACCOUNT_ROLES.pop(user_id, None)
+
+
+def has_any_role(user: UserRecord, account_id: Optional[int], required_mask: int) -> bool:
+    return bool(get_permission_mask(user, account_id) & required_mask)
+
+
+def filter_allowed_accounts(
+    user: UserRecord, account_ids: Iterable[int], required_roles: Iterable[str]
+) -> Set[int]:
+    if user.is_superuser:
+        return {account_id for account_id in account_ids if account_id in ACCOUNTS}
+    required_mask = compile_roles(required_roles)
+    masks = get_account_masks(user.id)
+    return {
+        account_id
+        for account_id in account_ids
+        if masks.get(account_id, 0) & required_mask
+    }
+
+
+def add_membership(account_id: int, user_id: int, role: str) -> MembershipRecord:
+    validate_role(role)
+    if resolve_role(user_id, account_id) is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User already belongs to this account",
+        )
+    membership = MembershipRecord(
+        id=max((existing.id for existing in MEMBERSHIPS), default=0) + 1,
+        account_id=account_id,
+        user_id=user_id,
+        role=role,
+        created_at=datetime.utcnow(),
+    )
+    MEMBERSHIPS.append(membership)
+    invalidate_permissions(user_id)
+    bump_collection_version("memberships")
+    return membership
+
+
+def get_membership(membership_id: int) -> MembershipRecord:
+    for membership in MEMBERSHIPS:
+        if membership.id == membership_id:
+            return membership
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Membership not found",
+    )
+
+
+def update_membership_role(membership_id: int, role: str) -> MembershipRecord:
+    validate_role(role)
+    membership = get_membership(membership_id)
+    membership.role = role
+    invalidate_permissions(membership.user_id)
+    bump_collection_version("memberships")
+    return membership
+
+
+def remove_membership(membership_id: int) -> None:
+    membership = get_membership(membership_id)
+    MEMBERSHIPS.remove(membership)
+    invalidate_permissions(membership.user_id)
+    bump_collection_version("memberships")
+
+
 def ensure_can_access_account(user: UserRecord, account_id: int) -> None:
     if user.is_superuser:
         return
@@ -235,8 +499,7 @@ def require_role(session: SessionRecord, required_roles: List[str]) -> None:
         )
     if user.is_superuser:
         return
-    role = resolve_role(user.id, session.active_account_id)
-    if role not in required_roles:
+    if not has_any_role(user, session.active_account_id, compile_roles(required_roles)):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Insufficient permissions",
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from sqlalchemy import Column, Integer, Table, UniqueConstraint, func, select, update
+from sqlalchemy.engine import Connection, Engine, Row
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.bodies import BODY_CODEC, PLAIN_CODEC, compress_body
+from app.models import Article, BackfillCheckpoint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+PROGRESS_INTERVAL = 5.0
+
+Bind = Union[Engine, Connection]
+
+
+@dataclass
+class BackfillJob:
+    name: str
+    table: Table
+    columns: Sequence[ColumnElement]
+    process: Callable[[Connection, Sequence[Row]], None]
+    where: Optional[ColumnElement] = None
+    key: Optional[Column] = None
+
+    def __post_init__(self) -> None:
+        # Paging is `key > last_key`, so the key has to be unique (rows sharing
+        # a value across a chunk boundary would be skipped) and an integer (the
+        # checkpoint stores it as text and must parse it back).
+        key = self.key_column
+        if not isinstance(key.type, Integer) or not _is_unique(self.table, key):
+            raise ValueError(
+                f"Backfill {self.name!r}: key {key.name!r} must be a unique integer column"
+            )
+
+    @property
+    def key_column(self) -> Column:
+        if self.key is not None:
+            return self.key
+        (primary_key,) = self.table.primary_key.columns
+        return primary_key
+
+
+def _is_unique(table: Table, column: Column) -> bool:
+    if list(table.primary_key.columns) == [column] or column.unique:
+        return True
+    unique_sets = [
+        list(constraint.columns)
+        for constraint in table.constraints
+        if isinstance(constraint, UniqueConstraint)
+    ]
+    unique_sets += [list(index.columns) for index in table.indexes if index.unique]
+    return [column] in unique_sets
+
+
+@dataclass
+class BackfillProgress:
+    name: str
+    rows_done: int
+    rows_total: int
+    elapsed: float
+    last_key: Any
+
+    @property
+    def rate(self) -> float:
+        return self.rows_done / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        if not self.rate:
+            return None
+        return max(self.rows_total - self.rows_done, 0) / self.rate
+
+    def __str__(self) -> str:
+        percent = 100.0 * self.rows_done / self.rows_total if self.rows_total else 100.0
+        eta = f"{self.eta:.0f}s" if self.eta is not None else "?"
+        return (
+            f"{self.name}: {self.rows_done}/{self.rows_total} rows ({percent:.1f}%), "
+            f"{self.rate:.0f} rows/s, ETA {eta}, last key {self.last_key}"
+        )
+
+
+BACKFILLS: Dict[str, BackfillJob] = {}
+
+
+def register_backfill(job: BackfillJob) -> BackfillJob:
+    BACKFILLS[job.name] = job
+    return job
+
+
+@contextmanager
+def short_transaction(bind: Bind) -> Iterator[Connection]:
+    # Chunks always commit on their own pooled connection. Given a Connection
+    # (op.get_bind() inside autocommit_block()), only its engine is used, so
+    # the migration's own connection never holds the chunk's locks.
+    engine = bind if isinstance(bind, Engine) else bind.engine
+    with engine.begin() as connection:
+        yield connection
+
+
+def get_checkpoint(bind: Bind, name: str) -> Optional[Row]:
+    with short_transaction(bind) as connection:
+        return connection.execute(
+            select(BackfillCheckpoint.__table__).where(BackfillCheckpoint.name == name)
+        ).first()
+
+
+def reset_checkpoint(bind: Bind, name: str) -> None:
+    with short_transaction(bind) as connection:
+        connection.execute(
+            BackfillCheckpoint.__table__.delete().where(BackfillCheckpoint.name == name)
+        )
+
+
+def run_backfill(
+    bind: Bind,
+    job: BackfillJob,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    sleep_ratio: float = 0.0,
+    max_chunks: Optional[int] = None,
+    progress: Optional[Callable[[BackfillProgress], None]] = None,
+) -> BackfillProgress:
+    # Walks job.table in key order, `chunk_size` rows at a time. Each chunk
+    # and its checkpoint row commit together in one short transaction, so a
+    # crash or Ctrl-C resumes after the last committed chunk. After each chunk
+    # the runner sleeps `sleep_ratio` times as long as the chunk took, which
+    # leaves the database free for other writers in between.
+    report = progress or (lambda state: logger.info("%s", state))
+    checkpoints = BackfillCheckpoint.__table__
+    key = job.key_column
+    with short_transaction(bind) as connection:
+        checkpoints.create(connection, checkfirst=True)
+    checkpoint = get_checkpoint(bind, job.name)
+    if checkpoint is None:
+        with short_transaction(bind) as connection:
+            connection.execute(
+                checkpoints.insert().values(
+                    name=job.name, rows_done=0, started_at=datetime.utcnow()
+                )
+            )
+        last_key, rows_done = None, 0
+    else:
+        last_key, rows_done = checkpoint.last_key, checkpoint.rows_done
+        if checkpoint.finished_at is not None:
+            logger.info("Backfill %s already finished", job.name)
+            return BackfillProgress(job.name, 0, 0, 0.0, last_key)
+        if last_key is not None:
+            last_key = int(last_key)
+
+    def remaining(stmt: Any) -> Any:
+        if job.where is not None:
+            stmt = stmt.where(job.where)
+        if last_key is not None:
+            stmt = stmt.where(key > last_key)
+        return stmt
+
+    # Rate and ETA cover this run only, so a resumed job does not count the
+    # rows it skipped as instant progress.
+    with short_transaction(bind) as connection:
+        rows_total = connection.execute(
+            remaining(select(func.count()).select_from(job.table))
+        ).scalar_one()
+
+    started = time.monotonic()
+    done_this_run = 0
+    last_report = started
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        chunk_started = time.monotonic()
+        with short_transaction(bind) as connection:
+            rows: List[Row] = connection.execute(
+                remaining(select(key, *job.columns)).order_by(key).limit(chunk_size)
+            ).all()
+            if rows:
+                job.process(connection, rows)
+                last_key = rows[-1][0]
+                rows_done += len(rows)
+            connection.execute(
+                update(checkpoints)
+                .where(checkpoints.c.name == job.name)
+                .values(
+                    last_key=None if last_key is None else str(last_key),
+                    rows_done=rows_done,
+                    updated_at=datetime.utcnow(),
+                    finished_at=None if rows else datetime.utcnow(),
+                )
+            )
+        if not rows:
+            break
+        chunks += 1
+        done_this_run += len(rows)
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_INTERVAL:
+            report(
+                BackfillProgress(job.name, done_this_run, rows_total, now - started, last_key)
+            )
+            last_report = now
+        if sleep_ratio:
+            time.sleep((now - chunk_started) * sleep_ratio)
+
+    state = BackfillProgress(
+        job.name, done_this_run, rows_total, time.monotonic() - started, last_key
+    )
+    report(state)
+    return state
+
+
+def _compress_article_bodies(connection: Connection, rows: Sequence[Row]) -> None:
+    articles = Article.__table__
+    for article_id, body in rows:
+        codec, body_text, body_compressed = compress_body(body or "", BODY_CODEC)
+        if codec == PLAIN_CODEC:
+            continue
+        # Re-encoding is not a content change; keep updated_at so feed and
+        # sitemap regeneration does not treat every article as modified.
+        connection.execute(
+            update(articles)
+            .where(articles.c.id == article_id)
+            .values(
+                body_codec=codec,
+                body=body_text,
+                body_compressed=body_compressed,
+                updated_at=articles.c.updated_at,
+            )
+        )
+
+
+register_backfill(
+    BackfillJob(
+        name="article_body_codec",
+        table=Article.__table__,
+        columns=[Article.__table__.c.body],
+        where=Article.__table__.c.body_codec == PLAIN_CODEC,
+        process=_compress_article_bodies,
+    )
+)
+
+
+if __name__ == "__main__":
+    from app.db import engine
+
+    parser = argparse.ArgumentParser(description="Chunked online backfills")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    run_parser = subcommands.add_parser("run", help="Run or resume a backfill")
+    run_parser.add_argument("name", choices=sorted(BACKFILLS))
+    run_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    run_parser.add_argument(
+        "--sleep-ratio",
+        type=float,
+        default=1.0,
+        help="Pause after each chunk for this multiple of the chunk's run time",
+    )
+    status_parser = subcommands.add_parser("status", help="Show a backfill checkpoint")
+    status_parser.add_argument("name")
+    reset_parser = subcommands.add_parser("reset", help="Forget a backfill checkpoint")
+    reset_parser.add_argument("name")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if args.command == "run":
+        run_backfill(
+            engine,
+            BACKFILLS[args.name],
+            chunk_size=args.chunk_size,
+            sleep_ratio=args.sleep_ratio,
+        )
+    elif args.command == "status":
+        print(get_checkpoint(engine, args.name))
+    else:
+        reset_checkpoint(engine, args.name)
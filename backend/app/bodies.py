@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import os
+import zlib
+from typing import Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+PLAIN_CODEC = "plain"
+ZLIB_CODEC = "zlib"
+ZSTD_CODEC = "zstd"
+
+BODY_CODEC = os.getenv("ARTICLE_BODY_CODEC", PLAIN_CODEC)
+BODY_COMPRESSION_MIN_SIZE = 512
+EXCERPT_LENGTH = 280
+
+
+def compress_body(
+    body: str, codec: str = BODY_CODEC
+) -> Tuple[str, Optional[str], Optional[bytes]]:
+    # Returns (codec, text, compressed); exactly one of text/compressed is set.
+    raw = body.encode("utf-8")
+    if codec == PLAIN_CODEC or len(raw) < BODY_COMPRESSION_MIN_SIZE:
+        return PLAIN_CODEC, body, None
+    if codec == ZLIB_CODEC:
+        return ZLIB_CODEC, None, zlib.compress(raw, 6)
+    if codec == ZSTD_CODEC:
+        if zstandard is None:
+            raise RuntimeError("ARTICLE_BODY_CODEC=zstd requires the zstandard package")
+        return ZSTD_CODEC, None, zstandard.ZstdCompressor(level=3).compress(raw)
+    raise ValueError(f"Unknown article body codec: {codec}")
+
+
+def decompress_body(codec: str, text: Optional[str], compressed: Optional[bytes]) -> str:
+    if codec == PLAIN_CODEC:
+        return text or ""
+    if codec == ZLIB_CODEC:
+        return zlib.decompress(compressed).decode("utf-8")
+    if codec == ZSTD_CODEC:
+        if zstandard is None:
+            raise RuntimeError("Reading zstd article bodies requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(compressed).decode("utf-8")
+    raise ValueError(f"Unknown article body codec: {codec}")
+
+
+def summarize_body(body: str) -> Tuple[str, int]:
+    words = body.split()
+    excerpt = ""
+    for word in words:
+        candidate = f"{excerpt} {word}" if excerpt else word
+        if len(candidate) > EXCERPT_LENGTH:
+            excerpt = f"{excerpt}…" if excerpt else word[: EXCERPT_LENGTH - 1] + "…"
+            break
+        excerpt = candidate
+    return excerpt, len(words)
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+MINIMUM_SIZE = 1024
+CACHE_MAX_ENTRIES = 512
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Streamed bodies with an ETag (FileResponse sends 64KB chunks) are collected
+# up to this size so they can be compressed whole and cached.
+CACHE_MAX_BODY_SIZE = 8 * 1024 * 1024
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/xml",
+    "application/rss+xml",
+    "application/atom+xml",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+COMPRESSION_STATS: Dict[str, float] = {
+    "responses": 0,
+    "skipped": 0,
+    "bytes_in": 0,
+    "bytes_out": 0,
+    "cpu_seconds": 0.0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+}
+
+# (path, query, ETag, encoding) -> compressed body. Only responses carrying an
+# ETag are cached; ETags are only unique per resource, hence the URL in the key.
+COMPRESSED_CACHE: OrderedDict[Tuple[str, bytes, str, str], bytes] = OrderedDict()
+
+
+def supported_encodings() -> List[str]:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    best: Optional[str] = None
+    best_weight = 0.0
+    for encoding in supported_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compression_stats() -> Dict[str, float]:
+    stats = dict(COMPRESSION_STATS)
+    bytes_out = stats["bytes_out"]
+    stats["ratio"] = stats["bytes_in"] / bytes_out if bytes_out else 0.0
+    stats["cached_variants"] = len(COMPRESSED_CACHE)
+    stats["cached_bytes"] = sum(len(body) for body in COMPRESSED_CACHE.values())
+    return stats
+
+
+def cache_compressed(key: Tuple[str, bytes, str, str], compressed: bytes) -> None:
+    COMPRESSED_CACHE[key] = compressed
+    cached_bytes = sum(len(body) for body in COMPRESSED_CACHE.values())
+    while len(COMPRESSED_CACHE) > CACHE_MAX_ENTRIES or cached_bytes > CACHE_MAX_BYTES:
+        _, evicted = COMPRESSED_CACHE.popitem(last=False)
+        cached_bytes -= len(evicted)
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str) -> None:
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=5)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def sync_flush(self) -> bytes:
+        # Emits everything buffered so far without ending the stream.
+        if self._brotli is not None:
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def flush(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    compressor = _StreamCompressor(encoding)
+    return compressor.compress(data) + compressor.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        resource = (scope["path"], scope.get("query_string", b""))
+        responder = _CompressionResponder(
+            send,
+            encoding,
+            self.minimum_size,
+            resource,
+            request_headers.get("if-none-match", ""),
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(
+        self,
+        send: Send,
+        encoding: str,
+        minimum_size: int,
+        resource: Tuple[str, bytes],
+        if_none_match: str = "",
+    ) -> None:
+        self._send = send
+        self.resource = resource
+        self.if_none_match = if_none_match
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[_StreamCompressor] = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            if message["status"] == 304:
+                # A 304 stands in for the 200 this client would get. Only when
+                # that 200 is the encoded variant does it carry the weak
+                # validator and Vary; small bodies are sent uncompressed.
+                headers = MutableHeaders(raw=message["headers"])
+                if self._has_encoded_variant(headers.get("etag")):
+                    self._mark_encoded_variant(headers)
+                self.passthrough = True
+                return
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            content_length = headers.get("content-length")
+            too_small = (
+                content_length is not None and int(content_length) < self.minimum_size
+            )
+            self.passthrough = (
+                too_small
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                COMPRESSION_STATS["skipped"] += 1
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        if self.passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not more_body:
+                await self._send_whole(b"".join(self.buffer) + body if self.buffer else body)
+                return
+            if self._can_buffer(len(body)):
+                self.buffer.append(body)
+                self.buffered += len(body)
+                return
+            if self.buffer:
+                body = b"".join(self.buffer) + body
+                self.buffer = []
+
+        started = time.thread_time()
+        if self.compressor is None:
+            self.compressor = _StreamCompressor(self.encoding)
+            self._rewrite_headers(content_length=None)
+            await self._flush_start()
+        # Streamed chunks (e.g. text/event-stream) must reach the client as
+        # they are produced, so each one is flushed out of the compressor.
+        chunk = self.compressor.compress(body)
+        if more_body:
+            chunk += self.compressor.sync_flush()
+        else:
+            chunk += self.compressor.flush()
+            COMPRESSION_STATS["responses"] += 1
+        COMPRESSION_STATS["bytes_in"] += len(body)
+        COMPRESSION_STATS["bytes_out"] += len(chunk)
+        COMPRESSION_STATS["cpu_seconds"] += time.thread_time() - started
+        await self._send(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
+
+    async def _send_whole(self, body: bytes) -> None:
+        if len(body) < self.minimum_size:
+            COMPRESSION_STATS["skipped"] += 1
+            await self._flush_start()
+            await self._send({"type": "http.response.body", "body": body})
+            return
+        etag = Headers(raw=self.start["headers"]).get("etag")
+        key = (*self.resource, etag, self.encoding) if etag else None
+        compressed = COMPRESSED_CACHE.get(key) if key else None
+        if compressed is not None:
+            COMPRESSED_CACHE.move_to_end(key)
+            COMPRESSION_STATS["cache_hits"] += 1
+        else:
+            started = time.thread_time()
+            compressed = compress_bytes(body, self.encoding)
+            COMPRESSION_STATS["cpu_seconds"] += time.thread_time() - started
+            if key:
+                COMPRESSION_STATS["cache_misses"] += 1
+                cache_compressed(key, compressed)
+        COMPRESSION_STATS["responses"] += 1
+        COMPRESSION_STATS["bytes_in"] += len(body)
+        COMPRESSION_STATS["bytes_out"] += len(compressed)
+        self._rewrite_headers(content_length=len(compressed))
+        await self._flush_start()
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    def _can_buffer(self, size: int) -> bool:
+        # Bodies without an ETag (e.g. text/event-stream) are never cached and
+        # must reach the client chunk by chunk.
+        return (
+            "etag" in Headers(raw=self.start["headers"])
+            and self.buffered + size <= CACHE_MAX_BODY_SIZE
+        )
+
+    def _rewrite_headers(self, content_length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        self._mark_encoded_variant(headers)
+
+    def _has_encoded_variant(self, etag: Optional[str]) -> bool:
+        if not etag:
+            return False
+        if (*self.resource, etag, self.encoding) in COMPRESSED_CACHE:
+            return True
+        # The client validating with the weak form means it was sent the
+        # encoded variant earlier, even if the cache has since evicted it.
+        weak = etag if etag.startswith("W/") else f"W/{etag}"
+        return weak in (candidate.strip() for candidate in self.if_none_match.split(","))
+
+    def _mark_encoded_variant(self, headers: MutableHeaders) -> None:
+        headers.add_vary_header("Accept-Encoding")
+        # The encoded bytes differ from the identity representation, so the
+        # validator is downgraded to a weak one (RFC 9110 section 8.8.1).
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def _flush_start(self) -> None:
+        if self.start is not None:
+            await self._send(self.start)
+            self.start = None
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import argparse
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, IO, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models import PUBLISHED_STATUS, Account, Article, Category
+
+logger = logging.getLogger(__name__)
+
+FEEDS_DIR = os.getenv("FEEDS_DIR", os.path.abspath("generated"))
+SITE_URL = os.getenv("SITE_URL", "http://127.0.0.1:8000").rstrip("/")
+SITEMAP_SEGMENT_SIZE = 50000
+FEED_ITEM_LIMIT = 50
+SCAN_CHUNK_SIZE = 5000
+MAX_BOUNDARY_IDS = 1000
+STATE_FILE = "state.json"
+LOCK_FILE = ".lock"
+REGENERATE_DELAY = 5.0
+
+
+def article_url(slug: str) -> str:
+    return f"{SITE_URL}/articles/{quote(slug, safe='')}"
+
+
+def sitemap_name(segment: int) -> str:
+    return f"sitemap-{segment:05d}.xml"
+
+
+def feed_name(scope: str, key: str, fmt: str) -> str:
+    return f"{scope}-{key}.{fmt}"
+
+
+def w3c_datetime(value: Optional[datetime]) -> str:
+    return (value or datetime.utcnow()).replace(microsecond=0).isoformat() + "+00:00"
+
+
+def load_state(output_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(output_dir, STATE_FILE)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {}
+
+
+@contextmanager
+def atomic_writer(path: str) -> Iterator[IO[str]]:
+    # Readers keep getting the previous file until the new one is complete.
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as handle:
+        yield handle
+    os.replace(temp_path, path)
+
+
+@contextmanager
+def writer_lock(output_dir: str) -> Iterator[None]:
+    # One writer per output directory, across processes: the CLI and the
+    # app's background regeneration would otherwise share the same *.tmp files.
+    with open(os.path.join(output_dir, LOCK_FILE), "w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def iter_segment(
+    db: Session, segment: int
+) -> Iterator[Tuple[int, str, Optional[datetime]]]:
+    # Segments are fixed id ranges, so an article always maps to the same
+    # file and a change only dirties that one file. Rows are read in keyset
+    # chunks to keep memory flat regardless of table size.
+    last_id = segment * SITEMAP_SEGMENT_SIZE - 1
+    end_id = (segment + 1) * SITEMAP_SEGMENT_SIZE
+    while True:
+        rows = db.execute(
+            select(Article.id, Article.slug, Article.updated_at)
+            .where(
+                Article.id > last_id,
+                Article.id < end_id,
+                Article.status == PUBLISHED_STATUS,
+            )
+            .order_by(Article.id)
+            .limit(SCAN_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def write_sitemap_segment(db: Session, output_dir: str, segment: int) -> Dict[str, Any]:
+    path = os.path.join(output_dir, sitemap_name(segment))
+    count = 0
+    lastmod: Optional[datetime] = None
+    with atomic_writer(path) as handle:
+        handle.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        handle.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for _, slug, updated_at in iter_segment(db, segment):
+            handle.write(
+                f"<url><loc>{escape(article_url(slug))}</loc>"
+                f"<lastmod>{w3c_datetime(updated_at)}</lastmod></url>\n"
+            )
+            count += 1
+            if updated_at and (lastmod is None or updated_at > lastmod):
+                lastmod = updated_at
+        handle.write("</urlset>\n")
+    if count == 0:
+        os.remove(path)
+    return {"count": count, "lastmod": w3c_datetime(lastmod)}
+
+
+def write_sitemap_index(output_dir: str, segments: Dict[str, Dict[str, Any]]) -> None:
+    with atomic_writer(os.path.join(output_dir, "sitemap.xml")) as handle:
+        handle.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        handle.write(
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        )
+        for segment in sorted(segments, key=int):
+            loc = f"{SITE_URL}/sitemaps/{sitemap_name(int(segment))}"
+            handle.write(
+                f"<sitemap><loc>{escape(loc)}</loc>"
+                f"<lastmod>{segments[segment]['lastmod']}</lastmod></sitemap>\n"
+            )
+        handle.write("</sitemapindex>\n")
+
+
+def write_feeds(
+    db: Session, output_dir: str, scope: str, key: str, title: str, condition: Any
+) -> None:
+    articles = db.execute(
+        select(Article.title, Article.slug, Article.excerpt, Article.published_at)
+        .where(condition, Article.status == PUBLISHED_STATUS)
+        .order_by(Article.published_at.desc(), Article.id.desc())
+        .limit(FEED_ITEM_LIMIT)
+    ).all()
+    feed_url = f"{SITE_URL}/feeds/{feed_name(scope, key, 'atom')}"
+    updated = max(
+        (row.published_at for row in articles if row.published_at), default=None
+    )
+
+    with atomic_writer(os.path.join(output_dir, feed_name(scope, key, "rss"))) as handle:
+        handle.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        handle.write('<rss version="2.0"><channel>')
+        handle.write(
+            f"<title>{escape(title)}</title><link>{escape(SITE_URL)}</link>"
+            f"<description>{escape(title)}</description>\n"
+        )
+        for row in articles:
+            published = row.published_at or datetime.utcnow()
+            published = published.replace(tzinfo=timezone.utc)
+            handle.write(
+                f"<item><title>{escape(row.title)}</title>"
+                f"<link>{escape(article_url(row.slug))}</link>"
+                f"<guid>{escape(article_url(row.slug))}</guid>"
+                f"<pubDate>{format_datetime(published)}</pubDate>"
+                f"<description>{escape(row.excerpt or '')}</description></item>\n"
+            )
+        handle.write("</channel></rss>\n")
+
+    with atomic_writer(os.path.join(output_dir, feed_name(scope, key, "atom"))) as handle:
+        handle.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom">'
+            f"<title>{escape(title)}</title><id>{escape(feed_url)}</id>"
+            f'<link rel="self" href={quoteattr(feed_url)}/>'
+            f"<author><name>{escape(title)}</name></author>"
+            f"<updated>{w3c_datetime(updated)}</updated>\n"
+        )
+        for row in articles:
+            url = article_url(row.slug)
+            handle.write(
+                f"<entry><title>{escape(row.title)}</title><id>{escape(url)}</id>"
+                f"<link href={quoteattr(url)}/>"
+                f"<updated>{w3c_datetime(row.published_at)}</updated>"
+                f"<summary>{escape(row.excerpt or '')}</summary></entry>\n"
+            )
+        handle.write("</feed>\n")
+
+
+def find_changes(
+    db: Session, watermark: datetime, boundary_ids: Set[int]
+) -> Tuple[Set[int], Set[int], Set[int]]:
+    segments: Set[int] = set()
+    account_ids: Set[int] = set()
+    category_ids: Set[int] = set()
+    cursor: Tuple[datetime, int] = (watermark, 0)
+    while True:
+        rows = db.execute(
+            select(Article.id, Article.account_id, Article.category_id, Article.updated_at)
+            .where(tuple_(Article.updated_at, Article.id) > tuple_(*cursor))
+            .order_by(Article.updated_at, Article.id)
+            .limit(SCAN_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        for article_id, account_id, category_id, updated_at in rows:
+            if updated_at == watermark and article_id in boundary_ids:
+                continue
+            segments.add(article_id // SITEMAP_SEGMENT_SIZE)
+            account_ids.add(account_id)
+            if category_id is not None:
+                category_ids.add(category_id)
+        cursor = (rows[-1][3], rows[-1][0])
+    return segments, account_ids, category_ids
+
+
+def regenerate(
+    db: Session, output_dir: str = FEEDS_DIR, full: bool = False
+) -> Dict[str, int]:
+    # Only segments and feeds touched by articles whose updated_at moved past
+    # the stored watermark are rewritten. Rows stamped exactly at the watermark
+    # are remembered by id so same-second updates are neither lost nor redone.
+    # The new watermark and its ids are read together, before scanning: a row
+    # updated later in the same second is then picked up by the next run.
+    # When a bulk update stamped more than MAX_BOUNDARY_IDS rows with the same
+    # time, no ids are kept and the next run re-scans that second instead.
+    os.makedirs(output_dir, exist_ok=True)
+    with writer_lock(output_dir):
+        return _regenerate(db, output_dir, full)
+
+
+def _regenerate(db: Session, output_dir: str, full: bool) -> Dict[str, int]:
+    state = {} if full else load_state(output_dir)
+    boundary_rows = db.execute(
+        select(Article.id, Article.updated_at).where(
+            Article.updated_at == select(func.max(Article.updated_at)).scalar_subquery()
+        )
+        .limit(MAX_BOUNDARY_IDS + 1)
+    ).all()
+    new_watermark = boundary_rows[0].updated_at if boundary_rows else None
+    boundary_ids = [article_id for article_id, _ in boundary_rows]
+    if len(boundary_ids) > MAX_BOUNDARY_IDS:
+        boundary_ids = []
+    watermark = state.get("watermark")
+
+    if watermark is None:
+        max_id = db.execute(select(func.max(Article.id))).scalar() or 0
+        segments = set(range(max_id // SITEMAP_SEGMENT_SIZE + 1))
+        account_ids = set(db.execute(select(Account.id)).scalars())
+        category_ids = set(db.execute(select(Category.id)).scalars())
+    else:
+        segments, account_ids, category_ids = find_changes(
+            db, datetime.fromisoformat(watermark), set(state.get("boundary_ids", []))
+        )
+
+    sitemap_segments: Dict[str, Dict[str, Any]] = state.get("segments", {})
+    for segment in segments:
+        summary = write_sitemap_segment(db, output_dir, segment)
+        if summary["count"]:
+            sitemap_segments[str(segment)] = summary
+        else:
+            sitemap_segments.pop(str(segment), None)
+    if segments or not os.path.exists(os.path.join(output_dir, "sitemap.xml")):
+        write_sitemap_index(output_dir, sitemap_segments)
+
+    for account_id, name in db.execute(
+        select(Account.id, Account.name).where(Account.id.in_(account_ids))
+    ):
+        condition = Article.account_id == account_id
+        write_feeds(db, output_dir, "account", str(account_id), name, condition)
+    # Files are keyed by id like account feeds: slugs are free text and could
+    # escape output_dir or fall outside what serve_generated() accepts.
+    for category_id, name in db.execute(
+        select(Category.id, Category.name).where(Category.id.in_(category_ids))
+    ):
+        condition = Article.category_id == category_id
+        write_feeds(db, output_dir, "category", str(category_id), name, condition)
+
+    with atomic_writer(os.path.join(output_dir, STATE_FILE)) as handle:
+        json.dump(
+            {
+                "watermark": new_watermark.isoformat() if new_watermark else None,
+                "boundary_ids": boundary_ids,
+                "segments": sitemap_segments,
+            },
+            handle,
+        )
+    return {
+        "segments": len(segments),
+        "account_feeds": len(account_ids),
+        "category_feeds": len(category_ids),
+    }
+
+
+class FeedRegenerator:
+    # Runs regenerate() on its own thread so publish listeners return at once.
+    # Requests arriving while a run is pending or in progress are coalesced:
+    # the worker waits REGENERATE_DELAY after the first request, then does a
+    # single incremental run covering everything published meanwhile.
+    def __init__(self, output_dir: str = FEEDS_DIR, delay: float = REGENERATE_DELAY) -> None:
+        self.output_dir = output_dir
+        self.delay = delay
+        self._condition = threading.Condition()
+        self._pending = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def request(self) -> None:
+        with self._condition:
+            self._pending = True
+            self._condition.notify()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="feed-regenerator", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                deadline = time.monotonic() + self.delay
+                while not self._stopping and time.monotonic() < deadline:
+                    self._condition.wait(timeout=deadline - time.monotonic())
+                if self._stopping:
+                    return
+                self._pending = False
+            try:
+                with SessionLocal() as db:
+                    regenerate(db, output_dir=self.output_dir)
+            except Exception:
+                logger.exception("Feed regeneration failed")
+
+
+feed_regenerator = FeedRegenerator()
+
+
+def regenerate_published(article_ids: List[int]) -> None:
+    # Files are rebuilt from the watermark, not from the ids, so a missed or
+    # coalesced request is caught up by the next run.
+    feed_regenerator.request()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sitemap and feed generation")
+    parser.add_argument("--full", action="store_true", help="Rewrite every file")
+    parser.add_argument("--output", default=FEEDS_DIR)
+    args = parser.parse_args()
+    with SessionLocal() as session:
+        print(regenerate(session, output_dir=args.output, full=args.full))
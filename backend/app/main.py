@@ -1,18 +1,26 @@
 from __future__ import annotations
 
+import os
+import re
+from contextlib import ExitStack, asynccontextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
-from fastapi import Depends, FastAPI, Header, HTTPException, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Response, status
+from fastapi.responses import FileResponse
 
 from app.auth import (
     ACCOUNTS,
     MEMBERSHIPS,
     USERS,
+    authenticate_introspection_client,
     authenticate_user,
+    collection_etag,
     ensure_can_access_account,
     get_memberships_for_user,
     get_session_from_access_token,
+    introspect_access_tokens,
+    introspection_max_age,
     issue_session,
     refresh_session,
     require_role,
@@ -23,15 +31,52 @@ from app.schemas import (
     AccountOut,
     AuthSession,
     AuthTokens,
+    IntrospectRequest,
+    IntrospectResponse,
     LoginRequest,
     MembershipOut,
     RefreshRequest,
     SwitchAccountRequest,
+    TokenIntrospectionOut,
     UserOut,
     UserWithMemberships,
 )
+from app.audit import audit_log
+from app.compression import CompressionMiddleware, compression_stats
+from app.feeds import FEEDS_DIR, feed_regenerator, regenerate_published
+from app.related import refresh_published, related_refresher
+from app.scheduler import publish_scheduler
 
-app = FastAPI(title="Test App")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    publish_scheduler.add_listener(refresh_published)
+    publish_scheduler.add_listener(regenerate_published)
+    publish_scheduler.load()
+    # Stopped in reverse order, each even if an earlier stop raised: the
+    # audit log drains first so queued events are written before the slower
+    # workers (a regeneration in progress) are waited for.
+    with ExitStack() as shutdown:
+        feed_regenerator.start()
+        shutdown.callback(feed_regenerator.stop)
+        related_refresher.start()
+        shutdown.callback(related_refresher.stop)
+        publish_scheduler.start()
+        shutdown.callback(publish_scheduler.stop)
+        audit_log.start()
+        shutdown.callback(audit_log.stop)
+        yield
+
+
+app = FastAPI(title="Test App", lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+
+GENERATED_FILE_NAME = re.compile(r"^[A-Za-z0-9_-]+\.(xml|rss|atom)$")
+GENERATED_MEDIA_TYPES = {
+    "xml": "application/xml",
+    "rss": "application/rss+xml",
+    "atom": "application/atom+xml",
+}
 
 
 def build_tokens(session) -> AuthTokens:
@@ -58,6 +103,13 @@ def get_current_session(authorization: Optional[str] = Header(default=None)):
     return get_session_from_access_token(token)
 
 
+def require_introspection_client(authorization: Optional[str] = Header(default=None)) -> None:
+    # RFC 7662 section 4: the introspection endpoint must authenticate its
+    # callers. Gateways send the shared secret as a Bearer credential.
+    scheme, _, secret = (authorization or "").partition(" ")
+    authenticate_introspection_client(secret if scheme.lower() == "bearer" else None)
+
+
 def get_current_user(session=Depends(get_current_session)) -> UserOut:
     user = USERS.get(session.user_id)
     if not user:
@@ -68,11 +120,38 @@ def get_current_user(session=Depends(get_current_session)) -> UserOut:
     return UserOut(**user.__dict__)
 
 
+def serve_generated(name: str) -> FileResponse:
+    match = GENERATED_FILE_NAME.match(name)
+    path = os.path.join(FEEDS_DIR, name)
+    if not match or not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return FileResponse(
+        path,
+        media_type=GENERATED_MEDIA_TYPES[match.group(1)],
+        headers={"Cache-Control": "public, max-age=300"},
+    )
+
+
 @app.get("/")
 def read_root() -> dict[str, str]:
     return {"message": "Hello from FastAPI"}
 
 
+@app.get("/sitemap.xml")
+def sitemap_index() -> FileResponse:
+    return serve_generated("sitemap.xml")
+
+
+@app.get("/sitemaps/{name}")
+def sitemap_segment(name: str) -> FileResponse:
+    return serve_generated(name)
+
+
+@app.get("/feeds/{name}")
+def feed(name: str) -> FileResponse:
+    return serve_generated(name)
+
+
 @app.post("/auth/login", response_model=AuthSession)
 def login(payload: LoginRequest) -> AuthSession:
     user = authenticate_user(payload.email, payload.password)
@@ -80,6 +159,7 @@ def login(payload: LoginRequest) -> AuthSession:
     if active_account_id is not None:
         ensure_can_access_account(user, active_account_id)
     session = issue_session(user, active_account_id)
+    audit_log.record("login", user.id, active_account_id)
     active_account = (
         AccountOut(**ACCOUNTS[active_account_id].__dict__)
         if active_account_id in ACCOUNTS
@@ -96,12 +176,14 @@ def login(payload: LoginRequest) -> AuthSession:
 @app.post("/auth/logout")
 def logout(session=Depends(get_current_session)) -> dict[str, str]:
     revoke_session(session)
+    audit_log.record("logout", session.user_id, session.active_account_id)
     return {"message": "Logged out"}
 
 
 @app.post("/auth/refresh", response_model=AuthSession)
 def refresh(payload: RefreshRequest) -> AuthSession:
     session = refresh_session(payload.refresh_token)
+    audit_log.record("refresh", session.user_id, session.active_account_id)
     user = USERS[session.user_id]
     active_account = (
         AccountOut(**ACCOUNTS[session.active_account_id].__dict__)
@@ -132,6 +214,21 @@ def me(session=Depends(get_current_session)) -> AuthSession:
     )
 
 
+@app.post("/auth/introspect", response_model=IntrospectResponse)
+def introspect(
+    payload: IntrospectRequest,
+    response: Response,
+    _: None = Depends(require_introspection_client),
+) -> IntrospectResponse:
+    results = introspect_access_tokens(payload.tokens)
+    max_age = introspection_max_age(results)
+    response.headers["Cache-Control"] = f"private, max-age={max_age}"
+    return IntrospectResponse(
+        results=[TokenIntrospectionOut(**result.__dict__) for result in results],
+        max_age=max_age,
+    )
+
+
 @app.post("/auth/switch-account", response_model=AuthSession)
 def switch_account(
     payload: SwitchAccountRequest, session=Depends(get_current_session)
@@ -140,6 +237,7 @@ def switch_account(
     if payload.account_id is not None:
         ensure_can_access_account(user, payload.account_id)
     session.active_account_id = payload.account_id
+    audit_log.record("switch_account", user.id, payload.account_id)
     active_account = (
         AccountOut(**ACCOUNTS[payload.account_id].__dict__)
         if payload.account_id in ACCOUNTS
@@ -153,15 +251,41 @@ def switch_account(
     )
 
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison: compressed responses carry the W/ form of the tag.
+    candidates = [
+        candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")
+    ]
+    return "*" in candidates or etag in candidates
+
+
 @app.get("/admin/accounts", response_model=List[AccountOut])
-def list_accounts(session=Depends(get_current_session)) -> List[AccountOut]:
+def list_accounts(
+    response: Response,
+    session=Depends(get_current_session),
+    if_none_match: Optional[str] = Header(default=None),
+) -> List[AccountOut]:
     require_role(session, ["admin"])  # superuser allowed implicitly
+    etag = collection_etag("accounts")
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return [AccountOut(**account.__dict__) for account in ACCOUNTS.values()]
 
 
 @app.get("/admin/users", response_model=List[UserWithMemberships])
-def list_users(session=Depends(get_current_session)) -> List[UserWithMemberships]:
+def list_users(
+    response: Response,
+    session=Depends(get_current_session),
+    if_none_match: Optional[str] = Header(default=None),
+) -> List[UserWithMemberships]:
     require_role(session, ["admin"])  # superuser allowed implicitly
+    etag = collection_etag("users", "memberships")
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     users: List[UserWithMemberships] = []
     for user in USERS.values():
         memberships = get_memberships_for_user(user.id)
@@ -175,6 +299,20 @@ def list_users(session=Depends(get_current_session)) -> List[UserWithMemberships
 
 
 @app.get("/admin/memberships", response_model=List[MembershipOut])
-def list_memberships(session=Depends(get_current_session)) -> List[MembershipOut]:
+def list_memberships(
+    response: Response,
+    session=Depends(get_current_session),
+    if_none_match: Optional[str] = Header(default=None),
+) -> List[MembershipOut]:
     require_role(session, ["admin"])
+    etag = collection_etag("memberships")
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return [MembershipOut(**membership.__dict__) for membership in MEMBERSHIPS]
+
+
+@app.get("/admin/compression-stats")
+def get_compression_stats(session=Depends(get_current_session)) -> dict[str, float]:
+    require_role(session, ["admin"])
+    return compression_stats()
@@ -4,9 +4,12 @@ from datetime import datetime
 from typing import List, Optional
 
 from sqlalchemy import (
+    Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     MetaData,
     String,
     Table,
@@ -17,6 +20,8 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+from app.bodies import compress_body, decompress_body, summarize_body
+
 NAMING_CONVENTION = {
     "ix": "ix_%(column_0_label)s",
     "uq": "uq_%(table_name)s_%(column_0_name)s",
@@ -26,6 +31,11 @@ NAMING_CONVENTION = {
 }
 
 
+DRAFT_STATUS = "draft"
+SCHEDULED_STATUS = "scheduled"
+PUBLISHED_STATUS = "published"
+
+
 class Base(DeclarativeBase):
     metadata = MetaData(naming_convention=NAMING_CONVENTION)
 
@@ -33,8 +43,9 @@ class Base(DeclarativeBase):
 article_tags = Table(
     "article_tags",
     Base.metadata,
-    mapped_column("article_id", ForeignKey("articles.id"), primary_key=True),
-    mapped_column("tag_id", ForeignKey("tags.id"), primary_key=True),
+    Column("article_id", ForeignKey("articles.id"), primary_key=True),
+    Column("tag_id", ForeignKey("tags.id"), primary_key=True),
+    Index("ix_article_tags_tag_id", "tag_id", "article_id"),
 )
 
 
@@ -138,6 +149,12 @@ class Tag(Base):
 
 class Article(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        Index("ix_articles_status_published_at", "status", "published_at"),
+        Index("ix_articles_updated_at", "updated_at", "id"),
+        Index("ix_articles_account_feed", "account_id", "status", "published_at", "id"),
+        Index("ix_articles_category_feed", "category_id", "status", "published_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), nullable=False)
@@ -145,7 +162,20 @@ class Article(Base):
     category_id: Mapped[Optional[int]] = mapped_column(ForeignKey("categories.id"))
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     slug: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
-    body: Mapped[str] = mapped_column(Text, nullable=False)
+    # The body is only loaded by detail views (undefer_group("body")); list
+    # queries use excerpt and word_count instead. Use the `body` property to
+    # read or write it, which applies ARTICLE_BODY_CODEC.
+    body_text: Mapped[Optional[str]] = mapped_column(
+        "body", Text, deferred=True, deferred_group="body"
+    )
+    body_compressed: Mapped[Optional[bytes]] = mapped_column(
+        LargeBinary, deferred=True, deferred_group="body"
+    )
+    body_codec: Mapped[str] = mapped_column(
+        String(16), nullable=False, default="plain", server_default=text("'plain'")
+    )
+    excerpt: Mapped[Optional[str]] = mapped_column(String(300))
+    word_count: Mapped[Optional[int]] = mapped_column(Integer)
     status: Mapped[str] = mapped_column(
         String(50), nullable=False, default="draft", server_default=text("'draft'")
     )
@@ -165,6 +195,24 @@ class Article(Base):
         back_populates="article", cascade="all, delete-orphan"
     )
 
+    @property
+    def body(self) -> str:
+        return decompress_body(self.body_codec, self.body_text, self.body_compressed)
+
+    @body.setter
+    def body(self, value: str) -> None:
+        self.body_codec, self.body_text, self.body_compressed = compress_body(value)
+        self.excerpt, self.word_count = summarize_body(value)
+
+
+class RelatedArticle(Base):
+    __tablename__ = "related_articles"
+
+    article_id: Mapped[int] = mapped_column(ForeignKey("articles.id"), primary_key=True)
+    related_id: Mapped[int] = mapped_column(ForeignKey("articles.id"), primary_key=True)
+    rank: Mapped[int] = mapped_column(Integer, nullable=False)
+    score: Mapped[int] = mapped_column(Integer, nullable=False)
+
 
 class MediaAsset(Base):
     __tablename__ = "media_assets"
@@ -181,3 +229,24 @@ class MediaAsset(Base):
     account: Mapped[Account] = relationship(back_populates="media_assets")
     uploader: Mapped[User] = relationship(back_populates="media_assets")
     article: Mapped[Optional[Article]] = relationship(back_populates="media_assets")
+
+
+class AuthAuditEvent(Base):
+    __tablename__ = "auth_audit_events"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    event: Mapped[str] = mapped_column(String(50), nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    account_id: Mapped[Optional[int]] = mapped_column(Integer)
+
+
+class BackfillCheckpoint(Base):
+    __tablename__ = "backfill_checkpoints"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    last_key: Mapped[Optional[str]] = mapped_column(String(255))
+    rows_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
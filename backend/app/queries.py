@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.orm import Session, undefer_group
+from sqlalchemy.util import LRUCache
+
+from app.models import PUBLISHED_STATUS, Article, Membership, User
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+FEED_PAGE_SIZE = 20
+
+
+class CountingLRUCache(LRUCache):
+    def __init__(self, capacity: int) -> None:
+        super().__init__(capacity)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = super().get(key, default)
+        if value is default:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+
+COMPILED_CACHE = CountingLRUCache(QUERY_CACHE_SIZE)
+CACHED_EXECUTION = {"compiled_cache": COMPILED_CACHE}
+
+
+def query_cache_stats() -> Dict[str, float]:
+    lookups = COMPILED_CACHE.hits + COMPILED_CACHE.misses
+    return {
+        "size": len(COMPILED_CACHE),
+        "capacity": QUERY_CACHE_SIZE,
+        "hits": COMPILED_CACHE.hits,
+        "misses": COMPILED_CACHE.misses,
+        "hit_rate": COMPILED_CACHE.hits / lookups if lookups else 0.0,
+    }
+
+
+def reset_query_cache() -> None:
+    COMPILED_CACHE.clear()
+    COMPILED_CACHE.hits = 0
+    COMPILED_CACHE.misses = 0
+
+
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    stmt = lambda_stmt(lambda: select(User).where(User.email == email))
+    return db.execute(stmt, execution_options=CACHED_EXECUTION).scalar_one_or_none()
+
+
+def get_role(db: Session, user_id: int, account_id: int) -> Optional[str]:
+    stmt = lambda_stmt(
+        lambda: select(Membership.role).where(
+            Membership.user_id == user_id, Membership.account_id == account_id
+        )
+    )
+    return db.execute(stmt, execution_options=CACHED_EXECUTION).scalar_one_or_none()
+
+
+def get_article_by_slug(db: Session, slug: str) -> Optional[Article]:
+    stmt = lambda_stmt(
+        lambda: select(Article).options(undefer_group("body")).where(Article.slug == slug)
+    )
+    return db.execute(stmt, execution_options=CACHED_EXECUTION).scalar_one_or_none()
+
+
+def get_feed_page(
+    db: Session,
+    account_id: Optional[int] = None,
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = FEED_PAGE_SIZE,
+) -> List[Article]:
+    # Keyset pagination on (published_at, id). Optional filters are appended
+    # as separate lambdas so each combination caches as its own statement.
+    stmt = lambda_stmt(lambda: select(Article).where(Article.status == PUBLISHED_STATUS))
+    if account_id is not None:
+        stmt += lambda s: s.where(Article.account_id == account_id)
+    if before is not None and before_id is not None:
+        stmt += lambda s: s.where(
+            (Article.published_at < before)
+            | ((Article.published_at == before) & (Article.id < before_id))
+        )
+    stmt += lambda s: s.order_by(Article.published_at.desc(), Article.id.desc()).limit(
+        limit
+    )
+    return list(db.execute(stmt, execution_options=CACHED_EXECUTION).scalars())
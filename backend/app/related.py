@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import SessionLocal
+from app.models import PUBLISHED_STATUS, Article, RelatedArticle, article_tags
+
+logger = logging.getLogger(__name__)
+
+RELATED_TOP_K = 10
+REBUILD_CHUNK_SIZE = 5000
+REFRESH_BATCH_SIZE = 1000
+IN_CLAUSE_CHUNK_SIZE = 500
+
+RelatedRow = Tuple[int, int]  # (related_id, score)
+
+_TAGS_BY_ARTICLE: Dict[int, Tuple[int, ...]] = {}
+_ARTICLES_BY_TAG: Dict[int, Tuple[int, ...]] = {}
+
+
+def rank_related(article_id: int, scores: Counter) -> List[RelatedRow]:
+    scores.pop(article_id, None)
+    # Highest overlap first; ties go to the newer (higher id) article.
+    return [
+        (related_id, score)
+        for score, related_id in heapq.nlargest(
+            RELATED_TOP_K, ((score, related_id) for related_id, score in scores.items())
+        )
+    ]
+
+
+def get_tag_ids(db: Session, article_id: int) -> Set[int]:
+    return set(
+        db.execute(
+            select(article_tags.c.tag_id).where(article_tags.c.article_id == article_id)
+        ).scalars()
+    )
+
+
+def compute_related(db: Session, article_id: int) -> List[RelatedRow]:
+    tag_ids = get_tag_ids(db, article_id)
+    if not tag_ids:
+        return []
+    score = func.count().label("score")
+    rows = db.execute(
+        select(article_tags.c.article_id, score)
+        .join(Article, Article.id == article_tags.c.article_id)
+        .where(
+            article_tags.c.tag_id.in_(tag_ids),
+            article_tags.c.article_id != article_id,
+            Article.status == PUBLISHED_STATUS,
+        )
+        .group_by(article_tags.c.article_id)
+        .order_by(score.desc(), article_tags.c.article_id.desc())
+        .limit(RELATED_TOP_K)
+    ).all()
+    return [(related_id, related_score) for related_id, related_score in rows]
+
+
+def compute_related_many(db: Session, article_ids: Iterable[int]) -> Dict[int, List[RelatedRow]]:
+    # Same ranking as compute_related(), scored in memory from two bulk reads
+    # instead of one aggregate query per article.
+    article_ids = sorted(set(article_ids))
+    tags_by_article: Dict[int, List[int]] = defaultdict(list)
+    for start in range(0, len(article_ids), IN_CLAUSE_CHUNK_SIZE):
+        for article_id, tag_id in db.execute(
+            select(article_tags.c.article_id, article_tags.c.tag_id).where(
+                article_tags.c.article_id.in_(article_ids[start : start + IN_CLAUSE_CHUNK_SIZE])
+            )
+        ):
+            tags_by_article[article_id].append(tag_id)
+    tag_ids = sorted(set().union(*tags_by_article.values()))
+    tag_rows: List[RelatedRow] = []
+    for start in range(0, len(tag_ids), IN_CLAUSE_CHUNK_SIZE):
+        tag_rows.extend(
+            db.execute(
+                select(article_tags.c.article_id, article_tags.c.tag_id).where(
+                    article_tags.c.tag_id.in_(tag_ids[start : start + IN_CLAUSE_CHUNK_SIZE])
+                )
+            ).tuples()
+        )
+    # Filtering on status in a join with a long tag list makes SQLite probe
+    # article_tags once per published article, so it is done as a separate
+    # primary-key lookup.
+    candidates = sorted({article_id for article_id, _ in tag_rows})
+    published: Set[int] = set()
+    for start in range(0, len(candidates), IN_CLAUSE_CHUNK_SIZE):
+        published.update(
+            db.execute(
+                select(Article.id).where(
+                    Article.id.in_(candidates[start : start + IN_CLAUSE_CHUNK_SIZE]),
+                    Article.status == PUBLISHED_STATUS,
+                )
+            ).scalars()
+        )
+    articles_by_tag: Dict[int, List[int]] = defaultdict(list)
+    for article_id, tag_id in tag_rows:
+        if article_id in published:
+            articles_by_tag[tag_id].append(article_id)
+    related: Dict[int, List[RelatedRow]] = {}
+    for article_id in article_ids:
+        scores: Counter = Counter()
+        for tag_id in tags_by_article.get(article_id, ()):
+            scores.update(articles_by_tag[tag_id])
+        related[article_id] = rank_related(article_id, scores)
+    return related
+
+
+def store_related(
+    db: Session, related: Dict[int, List[RelatedRow]], replace: bool = True
+) -> None:
+    if not related:
+        return
+    if replace:
+        db.execute(
+            delete(RelatedArticle).where(RelatedArticle.article_id.in_(list(related)))
+        )
+    rows = [
+        {"article_id": article_id, "related_id": related_id, "rank": rank, "score": score}
+        for article_id, entries in related.items()
+        for rank, (related_id, score) in enumerate(entries)
+    ]
+    if rows:
+        db.execute(insert(RelatedArticle.__table__), rows)
+
+
+def get_related(db: Session, article_id: int) -> List[Article]:
+    return list(
+        db.execute(
+            select(Article)
+            .join(RelatedArticle, RelatedArticle.related_id == Article.id)
+            .where(RelatedArticle.article_id == article_id)
+            .order_by(RelatedArticle.rank)
+        ).scalars()
+    )
+
+
+def refresh_related(
+    db: Session, article_id: int, previous_tag_ids: Iterable[int] = ()
+) -> int:
+    return refresh_related_batch(db, [article_id], {article_id: previous_tag_ids})
+
+
+def refresh_related_batch(
+    db: Session,
+    article_ids: Iterable[int],
+    previous_tag_ids: Mapping[int, Iterable[int]] = {},
+) -> int:
+    # Call after articles' tags or status change. Besides each article's own
+    # list, only neighbours sharing an old or new tag can be affected, and of
+    # those only the ones whose list a changed article enters, leaves or
+    # reorders. Neighbours are gathered across the whole batch, so each list
+    # is recomputed at most once and the batch commits once.
+    changed = set(article_ids)
+    if not changed:
+        return 0
+    published = set(
+        db.execute(
+            select(Article.id).where(
+                Article.id.in_(changed), Article.status == PUBLISHED_STATUS
+            )
+        ).scalars()
+    )
+    existing = set(db.execute(select(Article.id).where(Article.id.in_(changed))).scalars())
+    tag_ids: Dict[int, Set[int]] = defaultdict(set)
+    for article_id, tag_id in db.execute(
+        select(article_tags.c.article_id, article_tags.c.tag_id).where(
+            article_tags.c.article_id.in_(changed)
+        )
+    ):
+        tag_ids[article_id].add(tag_id)
+    affected_tags: Dict[int, Set[int]] = {
+        article_id: tag_ids[article_id] | set(previous_tag_ids.get(article_id, ()))
+        for article_id in changed
+    }
+
+    neighbour_tags: Dict[int, Set[int]] = defaultdict(set)
+    neighbours_by_tag: Dict[int, Set[int]] = defaultdict(set)
+    all_tags = set().union(*affected_tags.values())
+    if all_tags:
+        for neighbour_id, tag_id in db.execute(
+            select(article_tags.c.article_id, article_tags.c.tag_id).where(
+                article_tags.c.tag_id.in_(all_tags)
+            )
+        ):
+            if neighbour_id in changed:
+                continue
+            neighbour_tags[neighbour_id].add(tag_id)
+            neighbours_by_tag[tag_id].add(neighbour_id)
+
+    current: Dict[int, List[RelatedRow]] = defaultdict(list)
+    if neighbour_tags:
+        for neighbour_id, related_id, score in db.execute(
+            select(
+                RelatedArticle.article_id, RelatedArticle.related_id, RelatedArticle.score
+            )
+            .where(RelatedArticle.article_id.in_(list(neighbour_tags)))
+            .order_by(RelatedArticle.article_id, RelatedArticle.rank)
+        ):
+            current[neighbour_id].append((related_id, score))
+
+    stale: Set[int] = set()
+    for article_id in changed:
+        candidates: Set[int] = set()
+        for tag_id in affected_tags[article_id]:
+            candidates |= neighbours_by_tag.get(tag_id, set())
+        for neighbour_id in candidates - stale:
+            new_score = (
+                len(neighbour_tags[neighbour_id] & tag_ids[article_id])
+                if article_id in published
+                else 0
+            )
+            entries = current[neighbour_id]
+            if any(related_id == article_id for related_id, _ in entries):
+                stale.add(neighbour_id)
+            elif new_score == 0:
+                continue
+            elif len(entries) < RELATED_TOP_K:
+                stale.add(neighbour_id)
+            else:
+                lowest_id, lowest_score = entries[-1]
+                if (new_score, article_id) > (lowest_score, lowest_id):
+                    stale.add(neighbour_id)
+
+    related = compute_related_many(db, (changed & existing) | stale)
+    for article_id in changed - existing:
+        related[article_id] = []
+
+    store_related(db, related)
+    db.commit()
+    return len(related)
+
+
+class RelatedRefresher:
+    # Publish listeners run on the scheduler thread, so the refresh is handed
+    # to this worker instead. Ids published while a batch is running are
+    # collected and handled together in the next one; stop() drains what is
+    # still pending so no list is left stale until the next full rebuild.
+    def __init__(
+        self, session_factory: sessionmaker = SessionLocal, batch_size: int = REFRESH_BATCH_SIZE
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self._condition = threading.Condition()
+        self._pending: Set[int] = set()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def request(self, article_ids: Iterable[int]) -> None:
+        with self._condition:
+            self._pending.update(article_ids)
+            self._condition.notify()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="related-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                article_ids = sorted(self._pending)[: self.batch_size]
+                self._pending.difference_update(article_ids)
+            try:
+                with self.session_factory() as db:
+                    refresh_related_batch(db, article_ids)
+            except Exception:
+                logger.exception("Related refresh failed for %d articles", len(article_ids))
+
+
+related_refresher = RelatedRefresher()
+
+
+def refresh_published(article_ids: List[int]) -> None:
+    related_refresher.request(article_ids)
+
+
+def _init_worker(
+    tags_by_article: Dict[int, Tuple[int, ...]],
+    articles_by_tag: Dict[int, Tuple[int, ...]],
+) -> None:
+    _TAGS_BY_ARTICLE.update(tags_by_article)
+    _ARTICLES_BY_TAG.update(articles_by_tag)
+
+
+def _compute_chunk(article_ids: Sequence[int]) -> Dict[int, List[RelatedRow]]:
+    related: Dict[int, List[RelatedRow]] = {}
+    for article_id in article_ids:
+        scores: Counter = Counter()
+        for tag_id in _TAGS_BY_ARTICLE.get(article_id, ()):
+            scores.update(_ARTICLES_BY_TAG[tag_id])
+        related[article_id] = rank_related(article_id, scores)
+    return related
+
+
+def rebuild_related(db: Session, workers: Optional[int] = None) -> int:
+    published = set(
+        db.execute(select(Article.id).where(Article.status == PUBLISHED_STATUS)).scalars()
+    )
+    tags_by_article: Dict[int, List[int]] = defaultdict(list)
+    articles_by_tag: Dict[int, List[int]] = defaultdict(list)
+    for article_id, tag_id in db.execute(
+        select(article_tags.c.article_id, article_tags.c.tag_id)
+    ):
+        tags_by_article[article_id].append(tag_id)
+        if article_id in published:
+            articles_by_tag[tag_id].append(article_id)
+
+    article_ids = sorted(db.execute(select(Article.id)).scalars())
+    chunks = [
+        article_ids[start : start + REBUILD_CHUNK_SIZE]
+        for start in range(0, len(article_ids), REBUILD_CHUNK_SIZE)
+    ]
+    db.execute(delete(RelatedArticle))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            {article_id: tuple(tags) for article_id, tags in tags_by_article.items()},
+            {tag_id: tuple(ids) for tag_id, ids in articles_by_tag.items()},
+        ),
+    ) as pool:
+        for related in pool.map(_compute_chunk, chunks):
+            store_related(db, related, replace=False)
+    db.commit()
+    return len(article_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Related articles index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    with SessionLocal() as session:
+        total = rebuild_related(session, workers=args.workers)
+    print(f"Rebuilt related articles for {total} articles")
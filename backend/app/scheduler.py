@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import SessionLocal
+from app.models import DRAFT_STATUS, PUBLISHED_STATUS, SCHEDULED_STATUS, Article
+
+logger = logging.getLogger(__name__)
+
+PUBLISH_BATCH_SIZE = 500
+PUBLISH_RETRY_DELAY = timedelta(seconds=5)
+
+PublishListener = Callable[[List[int]], None]
+
+
+class PublishScheduler:
+    # Min-heap of (due, article_id). Rescheduling pushes a new entry and
+    # records the current due time in `_due`; heap entries that no longer
+    # match `_due` are stale and skipped when popped.
+    def __init__(self, session_factory: sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._heap: List[Tuple[datetime, int]] = []
+        self._due: Dict[int, datetime] = {}
+        self._listeners: List[PublishListener] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def add_listener(self, listener: PublishListener) -> None:
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def load(self) -> int:
+        # A database without the articles table (not yet migrated) must not
+        # stop the app from starting; the scheduler just starts out empty.
+        try:
+            with self._session_factory() as db:
+                rows = db.execute(
+                    select(Article.id, Article.published_at)
+                    .where(Article.status == SCHEDULED_STATUS)
+                    .order_by(Article.published_at)
+                ).all()
+        except SQLAlchemyError:
+            logger.exception("Could not load scheduled articles")
+            rows = []
+        with self._condition:
+            self._heap = [(due, article_id) for article_id, due in rows if due is not None]
+            heapq.heapify(self._heap)
+            self._due = {article_id: due for due, article_id in self._heap}
+            self._condition.notify()
+        return len(self._due)
+
+    def schedule(self, article_id: int, due: datetime) -> None:
+        with self._condition:
+            self._due[article_id] = due
+            heapq.heappush(self._heap, (due, article_id))
+            if self._heap[0] == (due, article_id):
+                self._condition.notify()
+
+    def cancel(self, article_id: int) -> None:
+        with self._condition:
+            self._due.pop(article_id, None)
+
+    def next_due(self) -> Optional[datetime]:
+        with self._condition:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[int]:
+        due_ids: List[int] = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                due, article_id = heapq.heappop(self._heap)
+                if self._due.get(article_id) == due:
+                    del self._due[article_id]
+                    due_ids.append(article_id)
+        return due_ids
+
+    def publish_due(self, now: Optional[datetime] = None) -> List[int]:
+        now = now or datetime.utcnow()
+        due_ids = self.pop_due(now)
+        if not due_ids:
+            return []
+        published: List[int] = []
+        start = 0
+        try:
+            with self._session_factory() as db:
+                for start in range(0, len(due_ids), PUBLISH_BATCH_SIZE):
+                    batch = due_ids[start : start + PUBLISH_BATCH_SIZE]
+                    batch_published = list(
+                        db.execute(
+                            update(Article)
+                            .where(
+                                Article.id.in_(batch),
+                                Article.status == SCHEDULED_STATUS,
+                                # Rescheduled after pop_due() took it: not due yet.
+                                Article.published_at <= now,
+                            )
+                            .values(status=PUBLISHED_STATUS)
+                            .returning(Article.id)
+                        ).scalars()
+                    )
+                    db.commit()
+                    published.extend(batch_published)
+        except Exception:
+            for article_id in due_ids[start:]:
+                self.schedule(article_id, now + PUBLISH_RETRY_DELAY)
+            raise
+        finally:
+            self._notify(published)
+        return published
+
+    def _notify(self, published: List[int]) -> None:
+        if not published:
+            return
+        for listener in self._listeners:
+            try:
+                listener(published)
+            except Exception:
+                logger.exception("Publish listener failed")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="publish-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._drop_stale()
+                if self._stopping:
+                    return
+                if self._heap:
+                    delay = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                    if delay > 0:
+                        self._condition.wait(timeout=delay)
+                        continue
+                else:
+                    self._condition.wait()
+                    continue
+            try:
+                self.publish_due()
+            except Exception:
+                logger.exception("Scheduled publish failed")
+
+
+publish_scheduler = PublishScheduler(SessionLocal)
+
+
+def schedule_publish(
+    db: Session,
+    article: Article,
+    due: datetime,
+    scheduler: PublishScheduler = publish_scheduler,
+) -> None:
+    article.status = SCHEDULED_STATUS
+    article.published_at = due
+    db.commit()
+    scheduler.schedule(article.id, due)
+
+
+def cancel_publish(
+    db: Session, article: Article, scheduler: PublishScheduler = publish_scheduler
+) -> None:
+    article.status = DRAFT_STATUS
+    db.commit()
+    scheduler.cancel(article.id)
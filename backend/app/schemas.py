@@ -61,3 +61,21 @@ class AuthSession(BaseModel):
     user: UserOut
     active_account: Optional[AccountOut]
     role: Optional[str]
+
+
+class IntrospectRequest(BaseModel):
+    tokens: List[str] = Field(max_length=1000, description="Access tokens to check")
+
+
+class TokenIntrospectionOut(BaseModel):
+    active: bool
+    status: str
+    user_id: Optional[int]
+    active_account_id: Optional[int]
+    role: Optional[str]
+    expires_in: int
+
+
+class IntrospectResponse(BaseModel):
+    results: List[TokenIntrospectionOut]
+    max_age: int
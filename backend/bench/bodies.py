@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, sessionmaker, undefer_group
+
+from app.bodies import PLAIN_CODEC, ZLIB_CODEC, compress_body, summarize_body
+from app.models import PUBLISHED_STATUS, Account, Article, Base, User
+
+PAGE_SIZE = 50
+
+
+def make_body(generator: random.Random, vocabulary: list, words: int) -> str:
+    paragraphs = []
+    for _ in range(max(1, words // 80)):
+        paragraphs.append(" ".join(generator.choices(vocabulary, k=80)) + ".")
+    return "\n\n".join(paragraphs)
+
+
+def build_database(path: str, articles: int, body_words: int, codec: str) -> sessionmaker:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    generator = random.Random(5)
+    vocabulary = [
+        "".join(generator.choices("abcdefghijklmnopqrstuvwxyz", k=generator.randint(2, 10)))
+        for _ in range(3000)
+    ]
+    rows = []
+    for article_id in range(1, articles + 1):
+        body = make_body(generator, vocabulary, body_words)
+        body_codec, body_text, body_compressed = compress_body(body, codec)
+        excerpt, word_count = summarize_body(body)
+        rows.append(
+            {
+                "id": article_id,
+                "account_id": 1,
+                "author_id": 1,
+                "title": f"Article {article_id}",
+                "slug": f"article-{article_id}",
+                "body": body_text,
+                "body_compressed": body_compressed,
+                "body_codec": body_codec,
+                "excerpt": excerpt,
+                "word_count": word_count,
+                "status": PUBLISHED_STATUS,
+            }
+        )
+    with engine.begin() as connection:
+        connection.execute(insert(Account), [{"id": 1, "name": "A", "email": "a@x"}])
+        connection.execute(insert(User), [{"id": 1, "email": "u@x"}])
+        connection.execute(insert(Article), rows)
+    return sessionmaker(bind=engine)
+
+
+def measure(factory: sessionmaker, rounds: int, work: Callable[[Session], None]) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        with factory() as db:
+            work(db)
+    elapsed = (time.perf_counter() - started) / rounds
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def list_page(deferred: bool) -> Callable[[Session], None]:
+    def work(db: Session) -> None:
+        query = select(Article).order_by(Article.id.desc()).limit(PAGE_SIZE)
+        if not deferred:
+            query = query.options(undefer_group("body"))
+        for article in db.execute(query).scalars():
+            article.excerpt, article.word_count
+
+    return work
+
+
+def detail(article_ids: list) -> Callable[[Session], None]:
+    def work(db: Session) -> None:
+        for article_id in article_ids:
+            db.execute(
+                select(Article).options(undefer_group("body")).where(Article.id == article_id)
+            ).scalar_one().body
+
+    return work
+
+
+def main(articles: int, body_words: int, rounds: int) -> None:
+    sample = random.Random(9).sample(range(1, articles + 1), 100)
+    with tempfile.TemporaryDirectory() as directory:
+        for codec in (PLAIN_CODEC, ZLIB_CODEC):
+            path = os.path.join(directory, f"{codec}.db")
+            factory = build_database(path, articles, body_words, codec)
+            print(f"{codec}: database {os.path.getsize(path) / 1e6:.1f}MB")
+            for deferred in (False, True):
+                elapsed, peak = measure(factory, rounds, list_page(deferred))
+                label = "deferred" if deferred else "eager"
+                print(
+                    f"  list page of {PAGE_SIZE}, {label} body: "
+                    f"{elapsed * 1000:.2f}ms, peak {peak / 1024:.0f}KB"
+                )
+            elapsed, _ = measure(factory, 1, detail(sample))
+            print(f"  detail view with body: {elapsed / len(sample) * 1000:.3f}ms")
+            factory.kw["bind"].dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deferred and compressed article bodies")
+    parser.add_argument("--articles", type=int, default=5_000)
+    parser.add_argument("--body-words", type=int, default=1_500)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    main(args.articles, args.body_words, args.rounds)
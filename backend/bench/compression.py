@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import COMPRESSED_CACHE, COMPRESSION_STATS, CompressionMiddleware
+
+
+def write_segment(path: str, urls: int) -> int:
+    with open(path, "wb") as handle:
+        handle.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<urlset>\n')
+        for article_id in range(urls):
+            handle.write(
+                b"<url><loc>https://magazine.example.com/articles/article-%d</loc>"
+                b"<lastmod>2026-10-18T12:00:00+00:00</lastmod></url>\n" % article_id
+            )
+        handle.write(b"</urlset>\n")
+    return os.path.getsize(path)
+
+
+def run(path: str, encoding: str, fetches: int, buffer_limit: int) -> None:
+    api = FastAPI()
+
+    @api.get("/sitemap.xml")
+    def sitemap() -> FileResponse:
+        return FileResponse(path, media_type="application/xml")
+
+    api.add_middleware(CompressionMiddleware)
+    compression.CACHE_MAX_BODY_SIZE = buffer_limit
+    COMPRESSED_CACHE.clear()
+    before = dict(COMPRESSION_STATS)
+    client = TestClient(api)
+    started = time.perf_counter()
+    for _ in range(fetches):
+        response = client.get("/sitemap.xml", headers={"accept-encoding": encoding})
+    elapsed = (time.perf_counter() - started) / fetches
+    label = "buffered" if buffer_limit else "streamed"
+    print(
+        f"{encoding} {label}: {elapsed * 1000:.1f}ms/request, "
+        f"{len(response.content)} -> {int(response.headers.get('content-length', 0)) or 'chunked'} bytes, "
+        f"cpu {COMPRESSION_STATS['cpu_seconds'] - before['cpu_seconds']:.3f}s, "
+        f"cache hits {COMPRESSION_STATS['cache_hits'] - before['cache_hits']:.0f}"
+    )
+
+
+def main(urls: int, fetches: int) -> None:
+    limit = compression.CACHE_MAX_BODY_SIZE
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sitemap.xml")
+        print(f"sitemap segment: {write_segment(path, urls) / 1e6:.1f}MB, {fetches} fetches")
+        for encoding in compression.supported_encodings():
+            run(path, encoding, fetches, 0)
+            run(path, encoding, fetches, limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compressed-variant cache for streamed files")
+    parser.add_argument("--urls", type=int, default=30_000)
+    parser.add_argument("--fetches", type=int, default=3)
+    args = parser.parse_args()
+    main(args.urls, args.fetches)
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from app import auth
+from app.auth import USERS, issue_session
+from app.main import app
+
+SECRET = "bench-secret"
+
+
+def main(requests: int) -> None:
+    auth.INTROSPECTION_SECRET = SECRET
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {SECRET}"}
+    tokens = [issue_session(USERS[2 + index % 2], 1).access_token for index in range(1000)]
+    for batch in (1, 100, 1000):
+        payload = {"tokens": tokens[:batch]}
+        client.post("/auth/introspect", json=payload, headers=headers)
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = client.post("/auth/introspect", json=payload, headers=headers)
+            assert response.status_code == 200
+        per_request = (time.perf_counter() - started) / requests
+        print(
+            f"batch of {batch:>4}: {per_request * 1000:6.2f}ms/request, "
+            f"{batch / per_request:9.0f} tokens/s"
+        )
+    me_headers = {"Authorization": f"Bearer {tokens[0]}"}
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get("/auth/me", headers=me_headers)
+    print(f"/auth/me:        {(time.perf_counter() - started) / requests * 1000:6.2f}ms/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Token introspection throughput")
+    parser.add_argument("--requests", type=int, default=200)
+    main(parser.parse_args().requests)
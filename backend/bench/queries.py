@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import Session, sessionmaker, undefer_group
+
+from app import queries
+from app.models import PUBLISHED_STATUS, Account, Article, Base, Membership, User
+
+
+def build_database(articles: int) -> sessionmaker:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(Account), [{"id": 1, "name": "A", "email": "a@x"}])
+        connection.execute(insert(User), [{"id": 1, "email": "u@x"}])
+        connection.execute(
+            insert(Membership), [{"id": 1, "account_id": 1, "user_id": 1, "role": "admin"}]
+        )
+        connection.execute(
+            insert(Article),
+            [
+                {
+                    "id": article_id,
+                    "account_id": 1,
+                    "author_id": 1,
+                    "title": f"Article {article_id}",
+                    "slug": f"article-{article_id}",
+                    "body": "body",
+                    "status": PUBLISHED_STATUS,
+                    "published_at": now - timedelta(minutes=article_id),
+                }
+                for article_id in range(1, articles + 1)
+            ],
+        )
+    return sessionmaker(bind=engine)
+
+
+def uncached_round(db: Session, article_id: int) -> None:
+    db.execute(select(User).where(User.email == "u@x")).scalar_one_or_none()
+    db.execute(
+        select(Membership.role).where(Membership.user_id == 1, Membership.account_id == 1)
+    ).scalar_one_or_none()
+    db.execute(
+        select(Article).options(undefer_group("body")).where(
+            Article.slug == f"article-{article_id}"
+        )
+    ).scalar_one_or_none()
+    list(
+        db.execute(
+            select(Article)
+            .where(Article.status == PUBLISHED_STATUS, Article.account_id == 1)
+            .order_by(Article.published_at.desc(), Article.id.desc())
+            .limit(queries.FEED_PAGE_SIZE)
+        ).scalars()
+    )
+
+
+def cached_round(db: Session, article_id: int) -> None:
+    queries.get_user_by_email(db, "u@x")
+    queries.get_role(db, 1, 1)
+    queries.get_article_by_slug(db, f"article-{article_id}")
+    queries.get_feed_page(db, account_id=1)
+
+
+def measure(
+    factory: sessionmaker, round_: Callable[[Session, int], None], rounds: int, articles: int
+) -> None:
+    db_seconds: List[float] = []
+    bind = factory.kw["bind"]
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._bench_started = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        db_seconds.append(time.perf_counter() - context._bench_started)
+
+    event.listen(bind, "before_cursor_execute", before)
+    event.listen(bind, "after_cursor_execute", after)
+    try:
+        with factory() as db:
+            started = time.perf_counter()
+            for index in range(rounds):
+                round_(db, index % articles + 1)
+                db.expunge_all()
+            elapsed = time.perf_counter() - started
+    finally:
+        event.remove(bind, "before_cursor_execute", before)
+        event.remove(bind, "after_cursor_execute", after)
+    per_query = elapsed / (rounds * 4) * 1e6
+    db_per_query = sum(db_seconds) / len(db_seconds) * 1e6
+    print(
+        f"{round_.__name__:>15}: {per_query:7.1f}us/query, "
+        f"{per_query - db_per_query:7.1f}us Python, {db_per_query:5.1f}us DB"
+    )
+
+
+def main(articles: int, rounds: int) -> None:
+    factory = build_database(articles)
+    queries.reset_query_cache()
+    measure(factory, uncached_round, rounds, articles)
+    measure(factory, cached_round, rounds, articles)
+    print(f"query cache: {queries.query_cache_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hot query microbenchmark")
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.articles, args.rounds)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import List
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models import (
+    PUBLISHED_STATUS,
+    SCHEDULED_STATUS,
+    Account,
+    Article,
+    Base,
+    RelatedArticle,
+    Tag,
+    User,
+    article_tags,
+)
+from app.related import (
+    compute_related,
+    get_related,
+    rebuild_related,
+    refresh_related,
+    refresh_related_batch,
+)
+
+
+def build_database(
+    path: str, articles: int, tags: int, tags_per_article: int, scheduled: int
+) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    generator = random.Random(7)
+    with engine.begin() as connection:
+        connection.execute(insert(Account), [{"id": 1, "name": "A", "email": "a@x"}])
+        connection.execute(insert(User), [{"id": 1, "email": "u@x"}])
+        connection.execute(
+            insert(Tag),
+            [{"id": tag_id, "name": f"t{tag_id}", "slug": f"t{tag_id}"} for tag_id in range(1, tags + 1)],
+        )
+        connection.execute(
+            insert(Article),
+            [
+                {
+                    "id": article_id,
+                    "account_id": 1,
+                    "author_id": 1,
+                    "title": "t",
+                    "slug": f"a-{article_id}",
+                    "body": "body",
+                    "status": SCHEDULED_STATUS if article_id > articles - scheduled else PUBLISHED_STATUS,
+                }
+                for article_id in range(1, articles + 1)
+            ],
+        )
+        connection.execute(
+            insert(article_tags),
+            [
+                {"article_id": article_id, "tag_id": tag_id}
+                for article_id in range(1, articles + 1)
+                for tag_id in generator.sample(range(1, tags + 1), tags_per_article)
+            ],
+        )
+    with sessionmaker(bind=engine)() as db:
+        started = time.perf_counter()
+        rebuild_related(db, workers=os.cpu_count())
+        print(f"full rebuild of {articles} articles: {time.perf_counter() - started:.1f}s")
+    engine.dispose()
+
+
+def publish(db: Session, article_ids: List[int]) -> None:
+    db.execute(
+        update(Article).where(Article.id.in_(article_ids)).values(status=PUBLISHED_STATUS)
+    )
+    db.commit()
+
+
+def related_rows(db: Session) -> List[tuple]:
+    return db.execute(
+        select(RelatedArticle.article_id, RelatedArticle.rank, RelatedArticle.related_id)
+        .order_by(RelatedArticle.article_id, RelatedArticle.rank)
+    ).all()
+
+
+def main(articles: int, tags: int, tags_per_article: int, published: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        base = os.path.join(directory, "base.db")
+        build_database(base, articles, tags, tags_per_article, published)
+        article_ids = list(range(articles - published + 1, articles + 1))
+        results = {}
+        for mode in ("per-id", "batch"):
+            path = os.path.join(directory, f"{mode}.db")
+            shutil.copy(base, path)
+            engine = create_engine(f"sqlite:///{path}")
+            with sessionmaker(bind=engine)() as db:
+                publish(db, article_ids)
+                started = time.perf_counter()
+                if mode == "per-id":
+                    for article_id in article_ids:
+                        refresh_related(db, article_id)
+                else:
+                    refresh_related_batch(db, article_ids)
+                elapsed = time.perf_counter() - started
+                print(f"refresh after publishing {published} articles, {mode}: {elapsed:.2f}s")
+                results[mode] = related_rows(db)
+                if mode == "batch":
+                    sample = random.Random(3).sample(range(1, articles + 1), 300)
+                    mismatches = sum(
+                        compute_related(db, article_id)
+                        != [
+                            (row.related_id, row.score)
+                            for row in db.execute(
+                                select(RelatedArticle.related_id, RelatedArticle.score)
+                                .where(RelatedArticle.article_id == article_id)
+                                .order_by(RelatedArticle.rank)
+                            )
+                        ]
+                        for article_id in sample
+                    )
+                    print(f"300 sampled lists vs fresh computation: {mismatches} mismatches")
+                    started = time.perf_counter()
+                    for article_id in sample:
+                        get_related(db, article_id)
+                        db.expunge_all()
+                    print(
+                        "get_related lookup: "
+                        f"{(time.perf_counter() - started) / len(sample) * 1000:.2f}ms"
+                    )
+            engine.dispose()
+        print(f"per-id and batch results identical: {results['per-id'] == results['batch']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Related articles maintenance cost")
+    parser.add_argument("--articles", type=int, default=20_000)
+    parser.add_argument("--tags", type=int, default=2_000)
+    parser.add_argument("--tags-per-article", type=int, default=5)
+    parser.add_argument("--published", type=int, default=300)
+    args = parser.parse_args()
+    main(args.articles, args.tags, args.tags_per_article, args.published)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import timeit
+from datetime import datetime
+
+from app import auth
+from app.auth import (
+    MembershipRecord,
+    compile_roles,
+    filter_allowed_accounts,
+    has_any_role,
+    resolve_role,
+)
+
+
+def legacy_has_role(user_id: int, account_id: int, roles: list) -> bool:
+    return resolve_role(user_id, account_id) in roles
+
+
+def per_call_us(statement, number: int) -> float:
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main(memberships: int) -> None:
+    user = auth.USERS[2]
+    # Pad the membership list with other users so scans have real work to do,
+    # then give user 2 one membership at the very end.
+    auth.MEMBERSHIPS[:] = [
+        MembershipRecord(
+            id=index,
+            account_id=index,
+            user_id=1000 + index,
+            role="member",
+            created_at=datetime.utcnow(),
+        )
+        for index in range(1, memberships)
+    ]
+    last_account = memberships
+    auth.MEMBERSHIPS.append(
+        MembershipRecord(memberships, last_account, user.id, "admin", datetime.utcnow())
+    )
+    auth.invalidate_permissions()
+    required = compile_roles(["admin"])
+    account_ids = list(range(1, memberships + 1))
+
+    print(f"{memberships} memberships, user {user.id}'s membership at the end")
+    print(
+        "role check, list scan:   "
+        f"{per_call_us(lambda: legacy_has_role(user.id, last_account, ['admin']), 200):8.2f}us"
+    )
+    print(
+        "role check, bitmask:     "
+        f"{per_call_us(lambda: has_any_role(user, last_account, required), 20000):8.2f}us"
+    )
+    print(
+        f"{len(account_ids)}-account batch, per-account scan: "
+        f"{per_call_us(lambda: [legacy_has_role(user.id, a, ['admin']) for a in account_ids], 1) / 1000:8.2f}ms"
+    )
+    print(
+        f"{len(account_ids)}-account batch, filter_allowed_accounts: "
+        f"{per_call_us(lambda: filter_allowed_accounts(user, account_ids, ['admin']), 100) / 1000:8.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Role check microbenchmark")
+    parser.add_argument("--memberships", type=int, default=2000)
+    main(parser.parse_args().memberships)
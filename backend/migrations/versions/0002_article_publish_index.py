@@ -0,0 +1,25 @@
+"""index articles by status and publish time
+
+Revision ID: 0002_article_publish_index
+Revises: 0001_initial
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+
+revision = "0002_article_publish_index"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_articles_status_published_at",
+        "articles",
+        ["status", "published_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_articles_status_published_at", table_name="articles")
@@ -0,0 +1,38 @@
+"""auth audit log
+
+Revision ID: 0003_auth_audit_events
+Revises: 0002_article_publish_index
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_auth_audit_events"
+down_revision = "0002_article_publish_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "auth_audit_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("occurred_at", sa.DateTime(), nullable=False),
+        sa.Column("event", sa.String(length=50), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("account_id", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_auth_audit_events")),
+    )
+    op.create_index(
+        op.f("ix_auth_audit_events_occurred_at"),
+        "auth_audit_events",
+        ["occurred_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_auth_audit_events_occurred_at"), table_name="auth_audit_events"
+    )
+    op.drop_table("auth_audit_events")
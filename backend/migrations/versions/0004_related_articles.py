@@ -0,0 +1,43 @@
+"""related articles by tag overlap
+
+Revision ID: 0004_related_articles
+Revises: 0003_auth_audit_events
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_related_articles"
+down_revision = "0003_auth_audit_events"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_article_tags_tag_id", "article_tags", ["tag_id", "article_id"])
+    op.create_table(
+        "related_articles",
+        sa.Column("article_id", sa.Integer(), nullable=False),
+        sa.Column("related_id", sa.Integer(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["article_id"],
+            ["articles.id"],
+            name=op.f("fk_related_articles_article_id_articles"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["related_id"],
+            ["articles.id"],
+            name=op.f("fk_related_articles_related_id_articles"),
+        ),
+        sa.PrimaryKeyConstraint(
+            "article_id", "related_id", name=op.f("pk_related_articles")
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("related_articles")
+    op.drop_index("ix_article_tags_tag_id", table_name="article_tags")
@@ -0,0 +1,106 @@
+"""deferred, optionally compressed article bodies with excerpts
+
+Revision ID: 0005_article_body_storage
+Revises: 0004_related_articles
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from typing import Tuple
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_article_body_storage"
+down_revision = "0004_related_articles"
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK_SIZE = 1000
+EXCERPT_LENGTH = 280
+
+articles = sa.table(
+    "articles",
+    sa.column("id", sa.Integer()),
+    sa.column("body", sa.Text()),
+    sa.column("excerpt", sa.String()),
+    sa.column("word_count", sa.Integer()),
+)
+
+
+def summarize_body(body: str) -> Tuple[str, int]:
+    # Frozen copy of app.bodies.summarize_body() as of this revision.
+    words = body.split()
+    excerpt = ""
+    for word in words:
+        candidate = f"{excerpt} {word}" if excerpt else word
+        if len(candidate) > EXCERPT_LENGTH:
+            excerpt = f"{excerpt}…" if excerpt else word[: EXCERPT_LENGTH - 1] + "…"
+            break
+        excerpt = candidate
+    return excerpt, len(words)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("articles") as batch_op:
+        batch_op.alter_column("body", existing_type=sa.Text(), nullable=True)
+        batch_op.add_column(sa.Column("body_compressed", sa.LargeBinary(), nullable=True))
+        batch_op.add_column(
+            sa.Column(
+                "body_codec",
+                sa.String(length=16),
+                nullable=False,
+                server_default=sa.text("'plain'"),
+            )
+        )
+        batch_op.add_column(sa.Column("excerpt", sa.String(length=300), nullable=True))
+        batch_op.add_column(sa.Column("word_count", sa.Integer(), nullable=True))
+
+    # Existing rows are all plain text; fill excerpt/word_count by id range.
+    # Outside the migration transaction each chunk commits on its own pooled
+    # connection, so the SQLite write lock is only held for one chunk at a time.
+    with op.get_context().autocommit_block():
+        engine = op.get_bind().engine
+        last_id = 0
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(
+                    sa.select(articles.c.id, articles.c.body)
+                    .where(articles.c.id > last_id)
+                    .order_by(articles.c.id)
+                    .limit(BACKFILL_CHUNK_SIZE)
+                ).all()
+                if not rows:
+                    break
+                updates = []
+                for article_id, body in rows:
+                    excerpt, word_count = summarize_body(body or "")
+                    updates.append(
+                        {"_id": article_id, "excerpt": excerpt, "word_count": word_count}
+                    )
+                connection.execute(
+                    articles.update()
+                    .where(articles.c.id == sa.bindparam("_id"))
+                    .values(
+                        excerpt=sa.bindparam("excerpt"), word_count=sa.bindparam("word_count")
+                    ),
+                    updates,
+                )
+            last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    # Compressed bodies cannot be represented once body_compressed is gone.
+    bind = op.get_bind()
+    compressed = bind.execute(
+        sa.text("SELECT COUNT(*) FROM articles WHERE body_codec != 'plain'")
+    ).scalar()
+    if compressed:
+        raise RuntimeError(
+            f"{compressed} articles have compressed bodies; decompress them before downgrading"
+        )
+    with op.batch_alter_table("articles") as batch_op:
+        batch_op.drop_column("word_count")
+        batch_op.drop_column("excerpt")
+        batch_op.drop_column("body_codec")
+        batch_op.drop_column("body_compressed")
+        batch_op.alter_column("body", existing_type=sa.Text(), nullable=False)
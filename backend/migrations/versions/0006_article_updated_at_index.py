@@ -0,0 +1,30 @@
+"""index articles for incremental feed generation
+
+Revision ID: 0006_article_updated_at_index
+Revises: 0005_article_body_storage
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+
+revision = "0006_article_updated_at_index"
+down_revision = "0005_article_body_storage"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_articles_updated_at", "articles", ["updated_at", "id"])
+    # Per-account and per-category feeds read the newest published articles.
+    op.create_index(
+        "ix_articles_account_feed", "articles", ["account_id", "status", "published_at", "id"]
+    )
+    op.create_index(
+        "ix_articles_category_feed", "articles", ["category_id", "status", "published_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_articles_category_feed", table_name="articles")
+    op.drop_index("ix_articles_account_feed", table_name="articles")
+    op.drop_index("ix_articles_updated_at", table_name="articles")
@@ -0,0 +1,31 @@
+"""checkpoints for chunked online backfills
+
+Revision ID: 0007_backfill_checkpoints
+Revises: 0006_article_updated_at_index
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_backfill_checkpoints"
+down_revision = "0006_article_updated_at_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "backfill_checkpoints",
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("last_key", sa.String(length=255), nullable=True),
+        sa.Column("rows_done", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("name", name=op.f("pk_backfill_checkpoints")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("backfill_checkpoints")
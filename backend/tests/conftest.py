@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--backfill-rows",
+        type=int,
+        default=50_000,
+        help="Rows migrated by the concurrent backfill test (use 5000000 for the full run)",
+    )
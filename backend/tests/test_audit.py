@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+
+from app import audit
+from app.audit import AuditLog
+from app.models import AuthAuditEvent, Base
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def stored_events(engine) -> int:
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(AuthAuditEvent)).scalar_one()
+
+
+def test_full_queue_drops_and_counts(engine):
+    log = AuditLog(engine, maxsize=3)
+    accepted = [log.record("login", user_id) for user_id in range(5)]
+    assert accepted == [True, True, True, False, False]
+    assert log.stats()["dropped"] == 2
+
+    log.start()
+    log.stop()
+    assert stored_events(engine) == 3
+
+
+def test_stop_flushes_queued_events(engine):
+    log = AuditLog(engine)
+    for user_id in range(2500):
+        log.record("login", user_id)
+    log.start()
+    log.stop()
+    assert stored_events(engine) == 2500
+    assert log.stats()["written"] == 2500
+    assert log.stats()["batches"] >= 3
+
+
+def test_flush_without_writer_returns(engine):
+    log = AuditLog(engine)
+    log.record("login", 1)
+    log.flush()
+    assert log.stats()["queued"] == 1
+
+
+def test_transient_errors_are_retried(engine, monkeypatch):
+    monkeypatch.setattr(audit, "AUDIT_RETRY_DELAY", 0.001)
+    log = AuditLog(engine)
+    write = log._write
+    failures = iter([True, True])
+
+    def flaky_write(batch):
+        if next(failures, False):
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        write(batch)
+
+    monkeypatch.setattr(log, "_write", flaky_write)
+    log.record("logout", 1)
+    log.start()
+    log.stop()
+    assert stored_events(engine) == 1
+    assert log.stats()["retries"] == 2
+    assert log.stats()["failed"] == 0
+
+
+def test_persistent_errors_count_the_batch_as_failed(engine, monkeypatch):
+    monkeypatch.setattr(audit, "AUDIT_RETRY_DELAY", 0.001)
+    log = AuditLog(engine)
+
+    def locked(batch):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(log, "_write", locked)
+    log.record("logout", 1)
+    log.record("logout", 2)
+    log.start()
+    log.stop()
+    assert log.stats()["failed"] == 2
+    assert log.stats()["retries"] == audit.AUDIT_WRITE_ATTEMPTS - 1
+
+
+def test_query_filters_by_range_event_and_user(engine, monkeypatch):
+    log = AuditLog(engine)
+    start = datetime(2026, 1, 1)
+    clock = iter(start + timedelta(minutes=minute) for minute in range(6))
+
+    class FixedClock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return next(clock)
+
+    monkeypatch.setattr(audit, "datetime", FixedClock)
+    for event, user_id in [
+        ("login", 1),
+        ("refresh", 1),
+        ("login", 2),
+        ("logout", 1),
+        ("login", 1),
+        ("login", 3),
+    ]:
+        log.record(event, user_id)
+    log.start()
+    log.stop()
+
+    window = (start + timedelta(minutes=1), start + timedelta(minutes=5))
+    assert [(r.event, r.user_id) for r in log.query(*window)] == [
+        ("refresh", 1),
+        ("login", 2),
+        ("logout", 1),
+        ("login", 1),
+    ]
+    assert [r.user_id for r in log.query(*window, event="login")] == [2, 1]
+    assert [r.event for r in log.query(*window, user_id=1)] == ["refresh", "logout", "login"]
+    assert len(log.query(*window, limit=2)) == 2
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
+import pytest
+from fastapi import HTTPException
+
+from app import auth
+from app.auth import (
+    USERS,
+    add_membership,
+    compile_roles,
+    filter_allowed_accounts,
+    get_account_masks,
+    issue_session,
+    remove_membership,
+    require_role,
+    update_membership_role,
+)
+
+SUPERUSER, ADMIN, EDITOR = USERS[1], USERS[2], USERS[3]
+
+
+@pytest.fixture(autouse=True)
+def memberships():
+    saved = [replace(membership) for membership in auth.MEMBERSHIPS]
+    auth.invalidate_permissions()
+    yield auth.MEMBERSHIPS
+    auth.MEMBERSHIPS[:] = saved
+    auth.invalidate_permissions()
+
+
+def assert_forbidden(user, account_id, roles):
+    with pytest.raises(HTTPException) as excinfo:
+        require_role(issue_session(user, account_id), roles)
+    assert excinfo.value.status_code == 403
+
+
+def test_require_role():
+    require_role(issue_session(ADMIN, 1), ["admin"])
+    require_role(issue_session(EDITOR, 1), ["member", "admin"])
+    require_role(issue_session(SUPERUSER, None), ["admin"])
+    assert_forbidden(EDITOR, 1, ["admin"])
+    assert_forbidden(ADMIN, 2, ["admin"])
+    assert_forbidden(ADMIN, None, ["admin"])
+
+
+def test_unknown_required_role_matches_nobody():
+    assert compile_roles(["admn"]) == 0
+    assert_forbidden(ADMIN, 1, ["admn"])
+
+
+def test_unknown_membership_role_is_rejected():
+    with pytest.raises(HTTPException) as excinfo:
+        add_membership(2, ADMIN.id, "owner")
+    assert excinfo.value.status_code == 400
+
+
+def test_filter_allowed_accounts():
+    assert filter_allowed_accounts(EDITOR, [1, 2, 3], ["admin"]) == {2}
+    assert filter_allowed_accounts(EDITOR, [1, 2, 3], ["member", "admin"]) == {1, 2}
+    assert filter_allowed_accounts(ADMIN, [1, 2], ["member"]) == set()
+    # Superusers get every existing account, but not ids with no account.
+    assert filter_allowed_accounts(SUPERUSER, [1, 2, 999], ["admin"]) == {1, 2}
+
+
+def test_add_membership_invalidates_masks():
+    assert filter_allowed_accounts(ADMIN, [2], ["admin"]) == set()
+    add_membership(2, ADMIN.id, "admin")
+    assert filter_allowed_accounts(ADMIN, [2], ["admin"]) == {2}
+    require_role(issue_session(ADMIN, 2), ["admin"])
+
+
+def test_update_membership_role_invalidates_masks():
+    require_role(issue_session(ADMIN, 1), ["admin"])
+    update_membership_role(1, "member")
+    assert_forbidden(ADMIN, 1, ["admin"])
+    require_role(issue_session(ADMIN, 1), ["member"])
+
+
+def test_remove_membership_invalidates_masks():
+    assert filter_allowed_accounts(EDITOR, [1, 2], ["member", "admin"]) == {1, 2}
+    remove_membership(3)
+    assert filter_allowed_accounts(EDITOR, [1, 2], ["member", "admin"]) == {1}
+
+
+def test_masks_built_during_invalidation_are_not_cached(monkeypatch):
+    # Simulate add_membership() running between the scan and the store.
+    real_role_bit = auth.role_bit
+
+    def role_bit_with_concurrent_change(role):
+        if not any(m.user_id == ADMIN.id and m.account_id == 2 for m in auth.MEMBERSHIPS):
+            monkeypatch.setattr(auth, "role_bit", real_role_bit)
+            add_membership(2, ADMIN.id, "admin")
+        return real_role_bit(role)
+
+    monkeypatch.setattr(auth, "role_bit", role_bit_with_concurrent_change)
+    get_account_masks(ADMIN.id)
+    assert ADMIN.id not in auth.PERMISSION_MASKS
+    admin_bit = auth.ROLE_BITS["admin"]
+    assert get_account_masks(ADMIN.id) == {1: admin_bit, 2: admin_bit}
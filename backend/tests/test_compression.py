@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import pytest
+from fastapi import FastAPI, Header, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import COMPRESSED_CACHE, COMPRESSION_STATS, CompressionMiddleware
+
+ETAG = '"v-1"'
+
+
+FILE_BODY = b"".join(b"<url><loc>https://example.com/a/%d</loc></url>\n" % i for i in range(20000))
+
+
+@pytest.fixture
+def client(tmp_path):
+    api = FastAPI()
+    (tmp_path / "sitemap.xml").write_bytes(FILE_BODY)
+
+    @api.get("/file")
+    def file():
+        return FileResponse(tmp_path / "sitemap.xml", media_type="application/xml")
+
+    @api.get("/stream")
+    def stream():
+        return StreamingResponse(
+            (FILE_BODY[start : start + 65536] for start in range(0, len(FILE_BODY), 65536)),
+            media_type="application/xml",
+        )
+
+    @api.get("/body/{size}")
+    def body(size: int, if_none_match: Optional[str] = Header(default=None)):
+        if if_none_match:
+            return Response(status_code=304, headers={"ETag": ETAG})
+        return Response("a" * size, media_type="text/plain", headers={"ETag": ETAG})
+
+    api.add_middleware(CompressionMiddleware)
+    COMPRESSED_CACHE.clear()
+    yield TestClient(api)
+    COMPRESSED_CACHE.clear()
+
+
+def get(client, path, **headers):
+    headers = {key.replace("_", "-"): value for key, value in headers.items()}
+    return client.get(path, headers={"accept-encoding": "gzip", **headers})
+
+
+@pytest.mark.parametrize("size", [10, 5000])
+def test_not_modified_repeats_the_validator_of_the_200(client, size):
+    full = get(client, f"/body/{size}")
+    revalidated = get(client, f"/body/{size}", if_none_match=full.headers["etag"])
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == full.headers["etag"]
+    assert revalidated.headers.get("vary") == full.headers.get("vary")
+
+
+def test_not_modified_after_cache_eviction_keeps_weak_validator(client):
+    full = get(client, "/body/5000")
+    COMPRESSED_CACHE.clear()
+    revalidated = get(client, "/body/5000", if_none_match=full.headers["etag"])
+    assert revalidated.headers["etag"] == f"W/{ETAG}"
+    assert revalidated.headers["vary"] == "Accept-Encoding"
+
+
+def test_streamed_file_is_compressed_once_and_cached(client):
+    hits = COMPRESSION_STATS["cache_hits"]
+    responses = [get(client, "/file") for _ in range(3)]
+    assert len(FILE_BODY) > 65536
+    for response in responses:
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.content == FILE_BODY
+        assert response.headers["etag"].startswith("W/")
+    assert COMPRESSION_STATS["cache_hits"] - hits == 2
+    assert len(COMPRESSED_CACHE) == 1
+
+
+def test_stream_above_buffer_cap_is_not_cached(client, monkeypatch):
+    monkeypatch.setattr(compression, "CACHE_MAX_BODY_SIZE", 100_000)
+    response = get(client, "/file")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == FILE_BODY
+    assert len(COMPRESSED_CACHE) == 0
+
+
+def test_stream_without_etag_is_not_buffered(client):
+    response = get(client, "/stream")
+    assert response.content == FILE_BODY
+    assert "content-length" not in response.headers
+    assert len(COMPRESSED_CACHE) == 0
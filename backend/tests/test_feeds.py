@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from xml.etree import ElementTree
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import feeds
+from app.feeds import SITE_URL, STATE_FILE, regenerate
+from app.main import GENERATED_FILE_NAME
+from app.models import PUBLISHED_STATUS, Account, Article, Base, Category, User
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'feeds.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Account), [{"id": 1, "name": "A & B", "email": "a@x"}])
+        connection.execute(insert(User), [{"id": 1, "email": "u@x", "password_hash": "x"}])
+        connection.execute(
+            insert(Category),
+            [
+                {"id": 1, "name": "Escaped", "slug": "../../escaped"},
+                {"id": 2, "name": "Dotted", "slug": "a.b"},
+            ],
+        )
+        connection.execute(
+            insert(Article),
+            [
+                {
+                    "id": article_id,
+                    "account_id": 1,
+                    "author_id": 1,
+                    "category_id": article_id,
+                    "title": f"Article {article_id}",
+                    "slug": slug,
+                    "status": PUBLISHED_STATUS,
+                    "published_at": datetime(2026, 1, article_id),
+                    "updated_at": datetime(2026, 1, 3),
+                }
+                for article_id, slug in [(1, 'say-"hi"'), (2, "a b/c?d")]
+            ],
+        )
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+def test_category_feeds_are_keyed_by_id(db, tmp_path):
+    output_dir = tmp_path / "generated"
+    result = regenerate(db, output_dir=str(output_dir))
+
+    assert result["category_feeds"] == 2
+    assert not os.path.exists(tmp_path / "escaped.rss")
+    names = sorted(os.listdir(output_dir))
+    for category_id in (1, 2):
+        for fmt in ("rss", "atom"):
+            name = f"category-{category_id}.{fmt}"
+            assert name in names
+            assert GENERATED_FILE_NAME.match(name)
+
+
+def test_feed_links_are_quoted_and_escaped(db, tmp_path):
+    output_dir = tmp_path / "generated"
+    regenerate(db, output_dir=str(output_dir))
+
+    atom = ElementTree.parse(output_dir / "account-1.atom").getroot()
+    assert atom.find(f"{ATOM}title").text == "A & B"
+    hrefs = [link.get("href") for link in atom.iter(f"{ATOM}link")]
+    assert hrefs[1:] == [
+        f"{SITE_URL}/articles/a%20b%2Fc%3Fd",
+        f"{SITE_URL}/articles/say-%22hi%22",
+    ]
+    rss = ElementTree.parse(output_dir / "category-1.rss").getroot()
+    assert rss.find("channel/item/link").text == f"{SITE_URL}/articles/say-%22hi%22"
+
+
+def test_unchanged_run_rewrites_nothing(db, tmp_path):
+    output_dir = str(tmp_path / "generated")
+    regenerate(db, output_dir=output_dir)
+    assert regenerate(db, output_dir=output_dir) == {
+        "segments": 0,
+        "account_feeds": 0,
+        "category_feeds": 0,
+    }
+
+
+def test_too_many_boundary_ids_rescans_that_second(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(feeds, "MAX_BOUNDARY_IDS", 1)
+    output_dir = tmp_path / "generated"
+    regenerate(db, output_dir=str(output_dir))
+
+    state = json.loads((output_dir / STATE_FILE).read_text())
+    assert state["watermark"] == datetime(2026, 1, 3).isoformat()
+    assert state["boundary_ids"] == []
+    assert regenerate(db, output_dir=str(output_dir))["category_feeds"] == 2
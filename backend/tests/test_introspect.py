@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import auth
+from app.auth import USERS, issue_session
+from app.main import app
+
+SECRET = "gateway-secret"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(auth, "INTROSPECTION_SECRET", SECRET)
+    return TestClient(app)
+
+
+def introspect(client, tokens, credential=SECRET):
+    headers = {"Authorization": f"Bearer {credential}"} if credential else {}
+    return client.post("/auth/introspect", json={"tokens": tokens}, headers=headers)
+
+
+def test_requires_gateway_credential(client):
+    assert introspect(client, ["x"], credential=None).status_code == 401
+    assert introspect(client, ["x"], credential="wrong").status_code == 401
+    user_token = issue_session(USERS[2], 1).access_token
+    assert introspect(client, ["x"], credential=user_token).status_code == 401
+
+
+def test_disabled_without_secret(monkeypatch):
+    monkeypatch.setattr(auth, "INTROSPECTION_SECRET", "")
+    assert introspect(TestClient(app), ["x"]).status_code == 403
+
+
+def test_reports_each_token_in_order(client):
+    admin = issue_session(USERS[2], 1)
+    editor = issue_session(USERS[3], 2)
+    response = introspect(client, [editor.access_token, "missing", admin.access_token])
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["active", "invalid", "active"]
+    assert (results[0]["user_id"], results[0]["role"]) == (3, "admin")
+    assert (results[2]["user_id"], results[2]["role"]) == (2, "admin")
+    assert results[1]["user_id"] is None
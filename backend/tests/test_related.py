@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import random
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models import (
+    PUBLISHED_STATUS,
+    SCHEDULED_STATUS,
+    Account,
+    Article,
+    Base,
+    RelatedArticle,
+    Tag,
+    User,
+    article_tags,
+)
+from app.related import (
+    RelatedRefresher,
+    compute_related,
+    rebuild_related,
+    refresh_related_batch,
+)
+
+ARTICLES = 600
+TAGS = 40
+SCHEDULED = 150
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'related.db'}")
+    Base.metadata.create_all(engine)
+    generator = random.Random(11)
+    with engine.begin() as connection:
+        connection.execute(insert(Account), [{"id": 1, "name": "A", "email": "a@x"}])
+        connection.execute(insert(User), [{"id": 1, "email": "u@x", "password_hash": "x"}])
+        connection.execute(
+            insert(Tag),
+            [{"id": tag_id, "name": f"t{tag_id}", "slug": f"t{tag_id}"} for tag_id in range(1, TAGS + 1)],
+        )
+        connection.execute(
+            insert(Article),
+            [
+                {
+                    "id": article_id,
+                    "account_id": 1,
+                    "author_id": 1,
+                    "title": f"Article {article_id}",
+                    "slug": f"article-{article_id}",
+                    "status": SCHEDULED_STATUS
+                    if article_id > ARTICLES - SCHEDULED
+                    else PUBLISHED_STATUS,
+                }
+                for article_id in range(1, ARTICLES + 1)
+            ],
+        )
+        connection.execute(
+            insert(article_tags),
+            [
+                {"article_id": article_id, "tag_id": tag_id}
+                for article_id in range(1, ARTICLES + 1)
+                for tag_id in generator.sample(range(1, TAGS + 1), 3)
+            ],
+        )
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        rebuild_related(db, workers=1)
+    yield factory
+    engine.dispose()
+
+
+def publish_scheduled(session_factory) -> List[int]:
+    article_ids = list(range(ARTICLES - SCHEDULED + 1, ARTICLES + 1))
+    with session_factory() as db:
+        db.execute(
+            update(Article).where(Article.id.in_(article_ids)).values(status=PUBLISHED_STATUS)
+        )
+        db.commit()
+    return article_ids
+
+
+def stored_lists(session_factory) -> Dict[int, List[tuple]]:
+    lists: Dict[int, List[tuple]] = {article_id: [] for article_id in range(1, ARTICLES + 1)}
+    with session_factory() as db:
+        for article_id, related_id, score in db.execute(
+            select(RelatedArticle.article_id, RelatedArticle.related_id, RelatedArticle.score)
+            .order_by(RelatedArticle.article_id, RelatedArticle.rank)
+        ):
+            lists[article_id].append((related_id, score))
+    return lists
+
+
+def fresh_lists(session_factory) -> Dict[int, List[tuple]]:
+    with session_factory() as db:
+        return {
+            article_id: compute_related(db, article_id)
+            for article_id in range(1, ARTICLES + 1)
+        }
+
+
+def test_batch_refresh_matches_fresh_computation(session_factory):
+    article_ids = publish_scheduled(session_factory)
+    with session_factory() as db:
+        refresh_related_batch(db, article_ids)
+    assert stored_lists(session_factory) == fresh_lists(session_factory)
+
+
+def test_small_batch_refresh_matches_fresh_computation(session_factory):
+    with session_factory() as db:
+        db.execute(update(Article).where(Article.id == ARTICLES).values(status=PUBLISHED_STATUS))
+        db.commit()
+        refresh_related_batch(db, [ARTICLES])
+    assert stored_lists(session_factory)[ARTICLES] == fresh_lists(session_factory)[ARTICLES]
+    assert stored_lists(session_factory) == fresh_lists(session_factory)
+
+
+def test_refresher_handles_requests_on_its_thread(session_factory):
+    refresher = RelatedRefresher(session_factory, batch_size=40)
+    refresher.request(publish_scheduled(session_factory))
+    assert stored_lists(session_factory) != fresh_lists(session_factory)
+
+    refresher.start()
+    refresher.stop()
+    assert stored_lists(session_factory) == fresh_lists(session_factory)
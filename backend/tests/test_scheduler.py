@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models import PUBLISHED_STATUS, SCHEDULED_STATUS, Account, Article, Base, User
+from app.scheduler import PublishScheduler, cancel_publish, schedule_publish
+
+SCHEDULED_ARTICLES = 100_000
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'scheduler.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Account), [{"id": 1, "name": "A", "email": "a@x"}])
+        connection.execute(
+            insert(User),
+            [{"id": 1, "email": "u@x", "password_hash": "x"}],
+        )
+        # Half of the articles are already overdue (missed while the app was
+        # down), the other half are due over the next 50k seconds.
+        connection.execute(
+            insert(Article),
+            [
+                {
+                    "id": article_id,
+                    "account_id": 1,
+                    "author_id": 1,
+                    "title": f"Article {article_id}",
+                    "slug": f"article-{article_id}",
+                    "status": SCHEDULED_STATUS,
+                    "published_at": NOW
+                    + timedelta(seconds=article_id - SCHEDULED_ARTICLES // 2),
+                }
+                for article_id in range(1, SCHEDULED_ARTICLES + 1)
+            ],
+        )
+    yield sessionmaker(bind=engine, expire_on_commit=False)
+    engine.dispose()
+
+
+def count_published(session_factory) -> int:
+    with session_factory() as db:
+        return db.execute(
+            select(func.count()).where(Article.status == PUBLISHED_STATUS)
+        ).scalar_one()
+
+
+def test_load_builds_heap_in_due_order(session_factory):
+    scheduler = PublishScheduler(session_factory)
+    assert scheduler.load() == SCHEDULED_ARTICLES
+    assert len(scheduler) == SCHEDULED_ARTICLES
+    assert scheduler.next_due() == NOW + timedelta(seconds=1 - SCHEDULED_ARTICLES // 2)
+
+
+def test_catches_up_missed_publishes(session_factory):
+    scheduler = PublishScheduler(session_factory)
+    notified: List[List[int]] = []
+    scheduler.add_listener(notified.append)
+    scheduler.load()
+
+    published = scheduler.publish_due(NOW)
+
+    assert len(published) == SCHEDULED_ARTICLES // 2
+    assert sorted(published) == list(range(1, SCHEDULED_ARTICLES // 2 + 1))
+    assert notified == [published]
+    assert count_published(session_factory) == SCHEDULED_ARTICLES // 2
+    assert len(scheduler) == SCHEDULED_ARTICLES // 2
+    assert scheduler.next_due() == NOW + timedelta(seconds=1)
+    assert scheduler.publish_due(NOW) == []
+
+
+def test_reschedule_and_cancel(session_factory):
+    scheduler = PublishScheduler(session_factory)
+    scheduler.load()
+    last_id = SCHEDULED_ARTICLES
+    with session_factory() as db:
+        schedule_publish(db, db.get(Article, last_id), NOW - timedelta(days=1), scheduler)
+        schedule_publish(db, db.get(Article, 1), NOW + timedelta(days=1), scheduler)
+        cancel_publish(db, db.get(Article, 2), scheduler)
+
+    published = scheduler.publish_due(NOW)
+
+    assert last_id in published
+    assert 1 not in published
+    assert 2 not in published
+    assert len(published) == SCHEDULED_ARTICLES // 2 - 1
+    assert len(scheduler) == SCHEDULED_ARTICLES // 2
+    # The stale heap entry for the original due time of article 1 is skipped.
+    assert 1 not in scheduler.publish_due(NOW + timedelta(hours=23))
+    assert 1 in scheduler.publish_due(NOW + timedelta(days=1))
+
+
+def test_rescheduled_after_pop_is_not_published_early(session_factory):
+    scheduler = PublishScheduler(session_factory)
+    scheduler.load()
+    # schedule_publish() moving article 1 later has committed, but the heap
+    # entry for its old due time was already popped by this publish run.
+    with session_factory() as db:
+        db.execute(
+            update(Article)
+            .where(Article.id == 1)
+            .values(published_at=NOW + timedelta(days=1))
+        )
+        db.commit()
+
+    published = scheduler.publish_due(NOW)
+
+    assert 1 not in published
+    assert len(published) == SCHEDULED_ARTICLES // 2 - 1
+
+
+def test_failed_commit_reschedules_without_notifying(session_factory, monkeypatch):
+    scheduler = PublishScheduler(session_factory)
+    notified: List[List[int]] = []
+    scheduler.add_listener(notified.append)
+    scheduler.load()
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.commit",
+        lambda self: (_ for _ in ()).throw(RuntimeError("database is locked")),
+    )
+
+    with pytest.raises(RuntimeError):
+        scheduler.publish_due(NOW)
+
+    assert notified == []
+    assert len(scheduler) == SCHEDULED_ARTICLES
+    assert scheduler.next_due() > NOW
+
+
+def test_load_without_tables_starts_empty(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    scheduler = PublishScheduler(sessionmaker(bind=engine))
+    assert scheduler.load() == 0
+    assert scheduler.next_due() is None